@@ -0,0 +1,106 @@
+import json
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import Transaction, BackType
+from fileio import atomic_write
+
+YearMonth = Tuple[int, int]
+
+class MonthlyAggregates:
+    """Spent cents and transaction counts per month and source.
+
+    The formatter fills it while it groups the transactions by month, so no
+    extra pass is needed. Range queries walk the months of the range only.
+    """
+    
+    def __init__(self):
+        self.cents: Dict[int, Dict[BackType, int]] = {}
+        self.counts: Dict[int, Dict[BackType, int]] = {}
+        self.prefixes: Dict[BackType, str] = {}
+    
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Transaction]) -> "MonthlyAggregates":
+        aggregates = cls()
+        for transaction in transactions:
+            month, source = transaction.month_ordinal, transaction.source_type
+            aggregates.cents.setdefault(month, {}).setdefault(source, 0)
+            aggregates.counts.setdefault(month, {}).setdefault(source, 0)
+            aggregates.cents[month][source] += abs(transaction.amount_cents)
+            aggregates.counts[month][source] += 1
+            aggregates.prefixes.setdefault(source, transaction.source_prefix)
+        return aggregates
+    
+    def set_month(self, month: int, month_transactions: Dict[BackType, List[Transaction]]):
+        """Replace the totals of ``month`` with those of its grouped transactions."""
+        self.cents[month] = {}
+        self.counts[month] = {}
+        for source, transactions in month_transactions.items():
+            if not transactions:
+                continue
+            self.cents[month][source] = sum(abs(transaction.amount_cents) for transaction in transactions)
+            self.counts[month][source] = len(transactions)
+            self.prefixes.setdefault(source, transactions[0].source_prefix)
+    
+    def months(self) -> List[int]:
+        return sorted(month for month, counts in self.counts.items() if counts)
+    
+    def spend_by_source(self, start: Optional[YearMonth] = None, end: Optional[YearMonth] = None) -> Dict[str, int]:
+        """Cents spent per source from ``start`` to ``end`` (both inclusive ``(year, month)``)."""
+        return self._range(self.cents, start, end)
+    
+    def counts_by_source(self, start: Optional[YearMonth] = None, end: Optional[YearMonth] = None) -> Dict[str, int]:
+        return self._range(self.counts, start, end)
+    
+    def total(self, start: Optional[YearMonth] = None, end: Optional[YearMonth] = None) -> int:
+        return sum(self.spend_by_source(start, end).values())
+    
+    def _range(self, index: Dict[int, Dict[BackType, int]], start: Optional[YearMonth], end: Optional[YearMonth]) -> Dict[str, int]:
+        if start is None or end is None:
+            months = [month for month, counts in self.counts.items() if counts]
+            if not months:
+                return {}
+        first = start[0] * 12 + start[1] - 1 if start else min(months)
+        last = end[0] * 12 + end[1] - 1 if end else max(months)
+        
+        totals = Counter()
+        for month in range(first, last + 1):
+            for source, value in index.get(month, {}).items():
+                totals[source] += value
+        return {source.name: totals[source] for source in sorted(totals, key=lambda source: source.value)}
+    
+    def summary(self) -> dict:
+        """Same shape as ``TransactionBatch.summary``, from the index alone."""
+        amount_by_month = {}
+        amount_by_year = Counter()
+        for month in self.months():
+            cents = sum(self.cents[month].values())
+            amount_by_month[f"{month // 12}-{month % 12 + 1:02d}"] = cents / 100
+            amount_by_year[month // 12] += cents
+        
+        counts = self.counts_by_source()
+        return {
+            'total_transactions': sum(counts.values()),
+            'total_amount': self.total() / 100,
+            'by_source': counts,
+            'amount_by_source': {source: cents / 100 for source, cents in self.spend_by_source().items()},
+            'amount_by_month': amount_by_month,
+            'amount_by_year': {year: cents / 100 for year, cents in sorted(amount_by_year.items())}
+        }
+    
+    def rows(self) -> List[list]:
+        """``[month, source, transactions, amount_cents]`` for every month and source."""
+        return [[f"{month // 12}-{month % 12 + 1:02d}", source.name, self.counts[month][source], self.cents[month][source]]
+                for month in self.months()
+                for source in sorted(self.counts[month], key=lambda source: source.value)]
+    
+    def write_report(self, path: str):
+        """Write the summary as JSON, or as a ``;`` separated CSV when ``path`` ends in ``.csv``."""
+        with atomic_write(path) as outfile:
+            if path.lower().endswith(".csv"):
+                lines = [["month", "source", "transactions", "amount_cents"]] + self.rows()
+                outfile.write("".join(";".join(map(str, line)) + "\n" for line in lines).encode("utf-8"))
+            else:
+                report = {'summary': self.summary(),
+                          'months': [dict(zip(("month", "source", "transactions", "amount_cents"), row)) for row in self.rows()]}
+                outfile.write(json.dumps(report, indent=2).encode("utf-8"))
+        print(f"Summary saved in {path}")
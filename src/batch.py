@@ -0,0 +1,151 @@
+import json
+import time
+import concurrent.futures
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from processor import TransactionProcessor
+from parser.parser import ParseError, TransactionParser, collect_errors
+from parser.registry import ParserRegistry
+
+SOURCE_FILES = {
+    'splitwise': "splitwise.csv",
+    'paypal': "paypal.csv",
+    'satispay': "satispay.xlsx"
+}
+DEFAULT_OUTPUT_NAME = "output.csv"
+
+@dataclass
+class BatchJob:
+    name: str
+    output: str
+    file_mappings: Dict[str, Union[str, List[str]]] = field(default_factory=dict)
+    owner: Optional[str] = None
+
+@dataclass
+class BatchResult:
+    job: BatchJob
+    seconds: float
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def load_manifest(path: str) -> List[BatchJob]:
+    """Read a JSON manifest, or a directory with one sub-directory per owner.
+
+    In the directory convention each sub-directory is named after the Splitwise
+    owner and holds ``splitwise.csv``, ``paypal.csv`` and/or ``satispay.xlsx``;
+    the output is written next to them as ``output.csv``. A job whose owner is
+    not a member column of its Splitwise export fails; a JSON manifest can name
+    the ``owner`` of a job explicitly.
+    """
+    manifest = Path(path)
+    if manifest.is_dir():
+        return _load_directory(manifest)
+    return _load_json(manifest)
+
+def _load_directory(directory: Path) -> List[BatchJob]:
+    jobs = []
+    for job_dir in sorted(p for p in directory.iterdir() if p.is_dir()):
+        file_mappings = {name: str(job_dir / filename)
+                         for name, filename in SOURCE_FILES.items()
+                         if (job_dir / filename).exists()}
+        if file_mappings:
+            jobs.append(BatchJob(name=job_dir.name,
+                                 output=str(job_dir / DEFAULT_OUTPUT_NAME),
+                                 file_mappings=file_mappings,
+                                 owner=job_dir.name))
+    return jobs
+
+def _load_json(manifest: Path) -> List[BatchJob]:
+    with open(manifest, mode="r", encoding="utf-8") as infile:
+        data = json.load(infile)
+    
+    entries = data["jobs"] if isinstance(data, dict) else data
+    base = manifest.parent
+    
+    jobs = []
+    for i, entry in enumerate(entries):
+        file_mappings = {name: _resolve(base, entry[name]) for name in SOURCE_FILES if entry.get(name)}
+        jobs.append(BatchJob(name=entry.get("name", entry.get("owner", f"job-{i + 1}")),
+                             output=str(base / entry["output"]),
+                             file_mappings=file_mappings,
+                             owner=entry.get("owner")))
+    return jobs
+
+def _resolve(base: Path, files: Union[str, List[str]]) -> Union[str, List[str]]:
+    if isinstance(files, str):
+        return str(base / files)
+    return [str(base / file) for file in files]
+
+class BatchRunner:
+    """Runs many jobs with one processor and one set of parsers per worker.
+
+    Parsers are created (and their modules imported) the first time a job
+    needs them; Splitwise parsers are kept per owner.
+    """
+    
+    def __init__(self, registry: Optional[ParserRegistry] = None):
+        self.registry = registry or ParserRegistry()
+        self.processor = TransactionProcessor()
+        self.parser_instances = {}
+    
+    def run(self, job: BatchJob) -> BatchResult:
+        """Run ``job``; a missing input, a parse error or an empty output makes it fail."""
+        started = time.perf_counter()
+        try:
+            missing = [path for files in job.file_mappings.values()
+                       for path in ([files] if isinstance(files, str) else files) if not Path(path).is_file()]
+            if missing:
+                raise FileNotFoundError(f"missing input {', '.join(missing)}")
+            
+            parsers = [self._parser(name, job.owner) for name in job.file_mappings]
+            for name, parser in zip(job.file_mappings, parsers):
+                self.processor.add_parser(name, parser)
+            Path(job.output).parent.mkdir(parents=True, exist_ok=True)
+            with collect_errors() as errors:
+                written = self.processor.process_files(job.file_mappings, job.output)
+            
+            if errors:
+                raise ParseError(errors)
+            if not written:
+                raise ValueError(f"no transactions found, {job.output} not written")
+        except Exception as e:
+            return BatchResult(job, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+        return BatchResult(job, time.perf_counter() - started)
+    
+    def _parser(self, name: str, owner: Optional[str]) -> TransactionParser:
+        options = {'name_onwer': owner} if name == 'splitwise' and owner else {}
+        key = (name, tuple(sorted(options.items())))
+        if key not in self.parser_instances:
+            self.parser_instances[key] = self.registry.create(name, **options)
+        return self.parser_instances[key]
+
+_worker_runner: Optional[BatchRunner] = None
+
+def _init_worker():
+    global _worker_runner
+    _worker_runner = BatchRunner()
+
+def _run_in_worker(job: BatchJob) -> BatchResult:
+    return _worker_runner.run(job)
+
+def run_batch(jobs: List[BatchJob], max_workers: int = 1) -> List[BatchResult]:
+    if max_workers > 1 and len(jobs) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+            return list(executor.map(_run_in_worker, jobs))
+    
+    runner = BatchRunner()
+    return [runner.run(job) for job in jobs]
+
+def print_report(results: List[BatchResult]):
+    print(f"\n{'Job':<30} {'Seconds':>8}  Status")
+    for result in results:
+        status = "ok" if result.ok else f"FAILED ({result.error})"
+        print(f"{result.job.name:<30} {result.seconds:>8.2f}  {status}")
+    
+    failed = sum(1 for result in results if not result.ok)
+    total = sum(result.seconds for result in results)
+    print(f"\n{len(results) - failed}/{len(results)} jobs succeeded, {total:.2f}s of parsing and formatting")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Serial versus chunked multi-process parsing of large Splitwise and PayPal exports.
+
+Run from ``src``: ``python -m benchmarks.bench_chunked --rows 2000000 --workers 2 4 8``
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from parser.paypal_parser import PaypalParser
+from parser.splitwise_parser import SplitwiseParser
+from benchmarks.generators import generate_paypal, generate_splitwise
+
+
+def measure(label: str, rows: int, parser, filepath: str):
+    started = time.perf_counter()
+    count = len(parser.parse_file(filepath))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed:7.2f}s  {rows / elapsed:12,.0f} rows/s  {count} transactions")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Chunked CSV parsing benchmark")
+    arg_parser.add_argument('--rows', type=int, default=1000000, help='Rows in the synthetic exports')
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[2, 4], help='Worker counts to compare')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, parser_class, generate in [("splitwise", SplitwiseParser, generate_splitwise),
+                                             ("paypal", PaypalParser, generate_paypal)]:
+            filepath = os.path.join(directory, f"{name}.csv")
+            generate(filepath, args.rows)
+            measure(f"{name} serial", args.rows, parser_class(), filepath)
+            for workers in args.workers:
+                measure(f"{name} {workers} workers", args.rows, parser_class(workers=workers), filepath)
+
+
+if __name__ == "__main__":
+    main()
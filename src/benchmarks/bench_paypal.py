@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Rows per second of the DictReader/strptime PayPal loop versus the fast path.
+
+Run from ``src``: ``python -m benchmarks.bench_paypal --rows 1000000``
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models import Transaction, BackType, to_cents
+from parser.paypal_parser import PaypalParser
+from benchmarks.generators import generate_paypal
+
+
+def legacy_iter(parser: PaypalParser, filepath: str):
+    with open(filepath, mode="r", encoding="utf-8-sig") as infile:
+        for row in csv.DictReader(infile, delimiter=',', quotechar='"', skipinitialspace=True):
+            if parser.should_include_transaction(row):
+                lordo_field = row.get("Lordo ", row.get("Lordo", "0"))
+                yield Transaction(
+                    description=row["Nome"].strip() if row["Nome"].strip() else row["Descrizione"],
+                    amount_cents=abs(to_cents(lordo_field.replace(",", "."))),
+                    date=datetime.strptime(row["Data"], "%d/%m/%Y"),
+                    source_type=BackType.PAYPAL,
+                    source_prefix=parser.get_source_prefix()
+                )
+
+
+def measure(label: str, rows: int, iterator):
+    started = time.perf_counter()
+    count = sum(1 for _ in iterator)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {elapsed:7.2f}s  {rows / elapsed:12,.0f} rows/s  {count} transactions")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="PayPal decoding benchmark")
+    arg_parser.add_argument('--rows', type=int, default=1000000, help='Rows in the synthetic export')
+    args = arg_parser.parse_args()
+
+    parser = PaypalParser()
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "paypal.csv")
+        generate_paypal(filepath, args.rows)
+        measure("dictreader", args.rows, legacy_iter(parser, filepath))
+        measure("fast", args.rows, parser._iter_file_transactions(filepath))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Compare the full-mode Satispay loader with the streaming read-only one.
+
+Run from ``src``: ``python -m benchmarks.bench_satispay --rows 100000``
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import openpyxl
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from parser.satispay_parser import SatispayParser
+from benchmarks.generators import generate_satispay
+
+
+def legacy_parse_file(parser: SatispayParser, filepath: str):
+    workbook = openpyxl.load_workbook(filepath)
+    worksheet = workbook["Transactions"]
+    headers = [cell.value for cell in worksheet[1]]
+    rows = []
+    for row in worksheet.iter_rows(min_row=2, values_only=True):
+        if any(cell is not None for cell in row):
+            rows.append(dict(zip(headers, row)))
+    transactions = [parser._create_transaction_from_row(row)
+                    for row in rows if parser.should_include_transaction(row)]
+    transactions.sort(key=lambda x: x.date)
+    return transactions
+
+
+def streaming_count(parser: SatispayParser, filepath: str):
+    return sum(1 for _ in parser._iter_file_transactions(filepath))
+
+
+def measure(label: str, func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = result if isinstance(result, int) else len(result)
+    print(f"{label:<12} {elapsed:8.2f}s  peak {peak / 1024 / 1024:8.1f} MiB  {count} transactions")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Satispay loader benchmark")
+    arg_parser.add_argument('--rows', type=int, default=50000, help='Rows in the synthetic export')
+    args = arg_parser.parse_args()
+
+    parser = SatispayParser()
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "satispay.xlsx")
+        generate_satispay(filepath, args.rows)
+        measure("full", legacy_parse_file, parser, filepath)
+        measure("streaming", streaming_count, parser, filepath)
+
+
+if __name__ == "__main__":
+    main()
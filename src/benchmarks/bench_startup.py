@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Cold-start import cost of ``main`` measured with ``python -X importtime``.
+
+Exits with status 1 when a module that should be imported lazily shows up,
+or when the median import time goes over ``--max-ms``, so it can guard CI.
+
+Run from ``src``: ``python -m benchmarks.bench_startup --runs 5``
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+LAZY_MODULES = ("asyncio", "numpy", "openpyxl", "parser.satispay_parser", "parser.paypal_parser", "parser.splitwise_parser")
+
+
+def import_times(module: str) -> dict:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Startup import-time benchmark")
+    arg_parser.add_argument('--module', default="main", help='Module to import (default: main)')
+    arg_parser.add_argument('--runs', type=int, default=5, help='Interpreter launches to take the median of')
+    arg_parser.add_argument('--max-ms', type=float, help='Fail when the median import time is above this')
+    args = arg_parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    median_ms = statistics.median(run[args.module] for run in runs) / 1000
+    
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs")
+    for name, micros in sorted(runs[-1].items(), key=lambda item: -item[1])[1:11]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    
+    failures = [f"{name} is imported at startup" for name in LAZY_MODULES if name in runs[-1]]
+    if args.max_ms is not None and median_ms > args.max_ms:
+        failures.append(f"median {median_ms:.1f} ms is above {args.max_ms} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
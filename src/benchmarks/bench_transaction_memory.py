@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Bytes per transaction of the old dict-backed dataclass versus the slotted one.
+
+Run from ``src``: ``python -m benchmarks.bench_transaction_memory --rows 100000``
+"""
+
+import argparse
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models import Transaction, BackType, to_cents
+from benchmarks.generators import PAYPAL_HEADER, paypal_rows
+
+@dataclass
+class LegacyTransaction:
+    description: str
+    amount: float
+    date: datetime
+    source_type: BackType
+    source_prefix: str
+    raw_data: dict = None
+
+
+def build_legacy(rows):
+    return [LegacyTransaction(row["Nome"], abs(float(row["Lordo "].replace(",", "."))),
+                              datetime.strptime(row["Data"], "%d/%m/%Y"), BackType.PAYPAL, "(Paypal)", row)
+            for row in rows]
+
+
+def build_slotted(rows):
+    return [Transaction(row["Nome"], abs(to_cents(row["Lordo "].replace(",", "."))),
+                        datetime.strptime(row["Data"], "%d/%m/%Y"), BackType.PAYPAL, "(Paypal)")
+            for row in rows]
+
+
+def bytes_per_transaction(builder, count: int) -> float:
+    tracemalloc.start()
+    rows = (dict(zip(PAYPAL_HEADER, row)) for row in paypal_rows(count))
+    transactions = builder(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(transactions)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Transaction memory benchmark")
+    arg_parser.add_argument('--rows', type=int, default=100000, help='Transactions to build')
+    args = arg_parser.parse_args()
+
+    legacy = bytes_per_transaction(build_legacy, args.rows)
+    slotted = bytes_per_transaction(build_slotted, args.rows)
+    print(f"dataclass + raw_data  {legacy:8.0f} bytes/transaction")
+    print(f"slots, integer cents  {slotted:8.0f} bytes/transaction")
+    print(f"reduction             {legacy / slotted:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Peak RSS and write throughput of the output writer.
+
+``list`` formats every row into a list before writing (the old behaviour),
+``stream`` feeds the row generator straight into the buffered atomic writer.
+Each mode runs in its own interpreter so peak RSS is not shared.
+
+Run from ``src``: ``python -m benchmarks.bench_writer --rows 1000000``
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from formatter import TransactionFormatter
+from benchmarks.generators import synthetic_transactions
+
+def run_mode(mode: str, rows: int, output_file: str, buffer_size: int):
+    formatter = TransactionFormatter(buffer_size=buffer_size)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if mode == "list":
+            formatter.write_to_csv(formatter.format_transactions(synthetic_transactions(rows)), output_file)
+        else:
+            formatter.write_to_csv(formatter.iter_formatted_rows(synthetic_transactions(rows), presorted=True),
+                                   output_file)
+    elapsed = time.perf_counter() - started
+    
+    size = os.path.getsize(output_file)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<7} {os.path.basename(output_file):<14} {elapsed:7.2f}s  {rows / elapsed:10,.0f} rows/s  "
+          f"{size / elapsed / 1024 / 1024:7.1f} MiB/s  peak RSS {peak_rss:7.1f} MiB")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Output writer benchmark")
+    arg_parser.add_argument('--rows', type=int, default=1000000, help='Transactions to write')
+    arg_parser.add_argument('--buffer-size', type=int, default=1024 * 1024, help='Write buffer in bytes')
+    arg_parser.add_argument('--mode', choices=['list', 'stream'], help=argparse.SUPPRESS)
+    arg_parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.rows, args.output, args.buffer_size)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, name in [("list", "output.csv"), ("stream", "output.csv"), ("stream", "output.csv.gz")]:
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_writer", "--rows", str(args.rows),
+                            "--buffer-size", str(args.buffer_size), "--mode", mode,
+                            "--output", os.path.join(directory, name)],
+                           cwd=Path(__file__).parent.parent, check=True)
+
+
+if __name__ == "__main__":
+    main()
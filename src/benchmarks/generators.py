@@ -0,0 +1,159 @@
+"""Deterministic synthetic exports for the benchmarks.
+
+Every generator takes a ``seed``: the same seed and row count always produce
+the same rows, so two benchmark runs read exactly the same input.
+"""
+
+import csv
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from models import Transaction, BackType
+from categories import CategoryRule
+
+START = datetime(2020, 1, 1)
+SPAN_DAYS = 5 * 365
+SPLITWISE_OWNER = "christian rocchetti"
+
+PAYPAL_HEADER = ["Data", "Ora", "Fuso orario", "Descrizione", "Valuta", "Lordo ", "Tariffa ", "Netto", "Saldo",
+                 "Codice transazione", "Indirizzo email mittente", "Nome", "Nome banca", "Conto bancario",
+                 "Importo per spedizione e imballaggio", "IVA", "N. fattura pro-forma",
+                 "Codice transazione di riferimento"]
+SPLITWISE_COLUMNS = ["Data", "Descrizione", "Categorie", "Costo", "Valuta"]
+SATISPAY_HEADER = ["Date", "Name", "Amount", "Type", "Status", "Balance", "Balance after transaction", "ID"]
+
+MERCHANTS = ["Esselunga", "Trenitalia", "Amazon EU", "Bar Centrale", "Farmacia Comunale", "Libreria Feltrinelli",
+             "Ristorante Da Mario", "Benzinaio Eni", "Cinema Odeon", "Mercato Rionale"]
+CATEGORIES = ["Alimentari", "Ristorante", "Trasporti", "Casa", "Svago"]
+CITIES = ["Milano", "Roma", "Torino", "Napoli"]
+
+SOURCES = [(BackType.SPLITWISE, "(Split)"), (BackType.PAYPAL, "(Paypal)"), (BackType.SATISPAY, "(Satispay)")]
+
+
+def _date(rng: random.Random, i: int, rows: int) -> datetime:
+    """Dates that grow with ``i`` over five years, with some jitter inside a day."""
+    return START + timedelta(days=i * SPAN_DAYS // max(rows, 1), seconds=rng.randrange(86400))
+
+
+def _euro(cents: int) -> str:
+    """Italian decimal notation, ``-1234`` becomes ``-12,34``."""
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100},{abs(cents) % 100:02d}"
+
+
+def paypal_rows(rows: int, seed: int = 0) -> Iterator[List[str]]:
+    """PayPal rows: every purchase is followed by the bank transfer that funds it."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        day = _date(rng, i, rows)
+        cents = rng.randrange(100, 30000)
+        debit = i % 2 == 0
+        merchant = MERCHANTS[rng.randrange(len(MERCHANTS))]
+        yield [f"{day.day}/{day.month}/{day.year}", day.strftime("%H:%M:%S"), "Europe/Rome",
+               "Pagamento Express Checkout" if debit else "Bonifico bancario sul conto PayPal",
+               "EUR", _euro(-cents if debit else cents), "0,00", _euro(-cents if debit else cents), "0,00",
+               f"{rng.getrandbits(64):017X}", f"info@{merchant.split()[0].lower()}.it" if debit else "",
+               merchant if debit else "", "" if debit else "Banca Nazionale SpA", "" if debit else "5612",
+               "0,00", "0,00", f"INV-{i}", ""]
+
+
+def generate_paypal(filepath: str, rows: int, seed: int = 0):
+    with open(filepath, mode="w", encoding="utf-8", newline="") as outfile:
+        writer = csv.writer(outfile, quoting=csv.QUOTE_ALL)
+        writer.writerow(PAYPAL_HEADER)
+        writer.writerows(paypal_rows(rows, seed))
+
+
+def splitwise_members(members: int) -> List[str]:
+    return [SPLITWISE_OWNER] + [f"Member {i}" for i in range(1, members)]
+
+
+def splitwise_rows(rows: int, members: int = 3, seed: int = 0) -> Iterator[List[str]]:
+    """Expenses split equally between ``members``; each member column holds paid minus owed.
+
+    About one expense in ten is the owner's own, with the whole cost in the
+    owner's column, as in the real exports.
+    """
+    rng = random.Random(seed)
+    for i in range(rows):
+        day = _date(rng, i, rows)
+        cents = rng.randrange(100, 30000)
+        if rng.random() < 0.1:
+            balances = [cents] + [0] * (members - 1)
+        else:
+            payer = rng.randrange(members)
+            share, remainder = divmod(cents, members)
+            balances = [-(share + (1 if member < remainder else 0)) for member in range(members)]
+            balances[payer] += cents
+        yield ([day.strftime("%Y-%m-%d"), MERCHANTS[rng.randrange(len(MERCHANTS))],
+                CATEGORIES[rng.randrange(len(CATEGORIES))], f"{cents / 100:.2f}", "EUR"]
+               + [f"{balance / 100:.2f}" for balance in balances])
+
+
+def generate_splitwise(filepath: str, rows: int, members: int = 3, seed: int = 0):
+    with open(filepath, mode="w", encoding="utf-8", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(SPLITWISE_COLUMNS + splitwise_members(members))
+        writer.writerows(splitwise_rows(rows, members, seed))
+
+
+def satispay_rows(rows: int, seed: int = 0) -> Iterator[list]:
+    """Satispay rows, roughly one top-up every five payments."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        day = _date(rng, i, rows)
+        top_up = rng.random() < 0.2
+        amount = 20.0 if top_up else -rng.randrange(100, 5000) / 100
+        yield [day, "Ricarica" if top_up else MERCHANTS[rng.randrange(len(MERCHANTS))], amount,
+               "Top up" if top_up else "to a Store", "Approved", amount, 50.0, f"id-{i}"]
+
+
+def generate_satispay(filepath: str, rows: int, seed: int = 0):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Transactions")
+    worksheet.append(SATISPAY_HEADER)
+    for row in satispay_rows(rows, seed):
+        worksheet.append(row)
+    workbook.save(filepath)
+
+
+def synthetic_transactions(rows: int, seed: int = 0) -> Iterator[Transaction]:
+    """Month-sorted transactions of the three sources, spread evenly over five years."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        source_type, prefix = SOURCES[i % 3]
+        yield Transaction(MERCHANTS[rng.randrange(len(MERCHANTS))], rng.randrange(100, 30000),
+                          _date(rng, i, rows), source_type, prefix)
+
+
+def category_rules(count: int, seed: int = 0) -> List[CategoryRule]:
+    """Keyword rules on ``brand<n>`` alone or followed by a city; one in 500 also has a regex, one in 7 is PayPal-only."""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        brand = f"brand{rng.randrange(count)}"
+        keyword = brand if rng.random() < 0.5 else f"{brand} {CITIES[rng.randrange(len(CITIES))]}"
+        rules.append(CategoryRule(CATEGORIES[i % len(CATEGORIES)], keywords=(keyword,),
+                                  pattern=rf"\bref{i}\b" if i % 500 == 0 else None,
+                                  sources=("paypal",) if i % 7 == 0 else ()))
+    return rules
+
+
+def categorized_transactions(rows: int, rule_count: int, seed: int = 0) -> Iterator[Transaction]:
+    """Transactions of every source whose descriptions name one of ``rule_count * 2`` brands, a city and a reference."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        source_type, prefix = SOURCES[i % 3]
+        description = (f"Pagamento Brand{rng.randrange(rule_count * 2)} {CITIES[rng.randrange(len(CITIES))]} "
+                       f"ref{rng.randrange(rule_count)}")
+        yield Transaction(description, rng.randrange(100, 30000), _date(rng, i, rows), source_type, prefix)
+
+
+GENERATORS = {
+    'paypal': (generate_paypal, "paypal.csv"),
+    'splitwise': (generate_splitwise, "splitwise.csv"),
+    'satispay': (generate_satispay, "satispay.xlsx")
+}
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Rows per second and peak memory of every parser, the formatter and the processor.
+
+Inputs come from ``benchmarks.generators`` and are cached in ``--data-dir``.
+Every case runs in its own interpreter so peak RSS is not shared. Results
+are written as JSON; with ``--baseline`` they are compared with an older run
+and the exit status is 1 when a case got slower than ``--max-regression``.
+
+Run from ``src``::
+
+    python -m benchmarks.run --rows 1000 100000 --output bench.json
+    python -m benchmarks.run --rows 1000 100000 --baseline bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks.generators import GENERATORS, categorized_transactions, category_rules, synthetic_transactions
+
+CASES = ["paypal", "splitwise", "satispay", "formatter", "categorizer", "processor"]
+DEFAULT_ROWS = [1000, 100000]
+CATEGORY_RULES = 5000
+
+
+def input_file(data_dir: str, source: str, rows: int, seed: int) -> str:
+    """Path of the generated export, created on first use."""
+    generate, filename = GENERATORS[source]
+    stem, extension = os.path.splitext(filename)
+    filepath = os.path.join(data_dir, f"{stem}-{rows}-{seed}{extension}")
+    if not os.path.exists(filepath):
+        generate(filepath, rows, seed=seed)
+    return filepath
+
+
+def run_case(case: str, rows: int, seed: int, data_dir: str, repeat: int) -> dict:
+    from formatter import TransactionFormatter
+    from parser.registry import ParserRegistry
+    from processor import TransactionProcessor
+
+    registry = ParserRegistry()
+    output_file = os.path.join(data_dir, f"output-{case}-{os.getpid()}.csv")
+
+    if case in GENERATORS:
+        parser = registry.create(case)
+        filepath = input_file(data_dir, case, rows, seed)
+        run = lambda: len(parser.parse_file(filepath))
+    elif case == "formatter":
+        formatter = TransactionFormatter()
+        transactions = list(synthetic_transactions(rows, seed))
+        run = lambda: formatter.write_to_csv(formatter.iter_formatted_rows(transactions, presorted=True), output_file)
+    elif case == "categorizer":
+        from categories import Categorizer
+        rules = category_rules(CATEGORY_RULES, seed)
+        transactions = list(categorized_transactions(rows, CATEGORY_RULES, seed))
+        run = lambda: sum(1 for transaction in Categorizer(rules).tag(transactions) if transaction.category)
+    else:
+        file_mappings = {source: input_file(data_dir, source, rows, seed) for source in GENERATORS}
+        processor = TransactionProcessor({source: registry.create(source) for source in GENERATORS})
+        run = lambda: processor.process_files(file_mappings, output_file)
+
+    best, transactions_out = None, None
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                transactions_out = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'case': case,
+        'rows': rows,
+        'seconds': best,
+        'rows_per_sec': rows / best,
+        'peak_rss_bytes': peak if sys.platform == "darwin" else peak * 1024,
+        'transactions': transactions_out
+    }
+
+
+def run_in_subprocess(case: str, rows: int, seed: int, data_dir: str, repeat: int) -> dict:
+    result = subprocess.run([sys.executable, "-m", "benchmarks.run", "--case", case, "--rows", str(rows),
+                             "--seed", str(seed), "--data-dir", data_dir, "--repeat", str(repeat)],
+                            cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Print the change of every case against ``baseline``, return the regressions."""
+    regressions = []
+    print(f"\n{'case':<22} {'baseline rows/s':>16} {'rows/s':>14} {'change':>8}")
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        change = result['rows_per_sec'] / previous['rows_per_sec'] - 1
+        print(f"{key:<22} {previous['rows_per_sec']:>16,.0f} {result['rows_per_sec']:>14,.0f} {change:>+8.1%}")
+        if change < -max_regression:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parser, formatter and processor benchmark suite")
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                            help=f'Input sizes to measure (default: {" ".join(map(str, DEFAULT_ROWS))})')
+    arg_parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help='Cases to run (default: all)')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic inputs')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the fastest is kept')
+    arg_parser.add_argument('--data-dir', help='Directory to keep the generated inputs in (default: temporary)')
+    arg_parser.add_argument('--output', help='Write the results to this JSON file')
+    arg_parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    arg_parser.add_argument('--max-regression', type=float, default=0.10,
+                            help='Slowdown against the baseline that fails the run (default: 0.10)')
+    arg_parser.add_argument('--case', choices=CASES, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.rows[0], args.seed, args.data_dir, args.repeat)))
+        return
+
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+
+        results = {}
+        print(f"{'case':<22} {'seconds':>9} {'rows/s':>14} {'peak RSS':>12}")
+        for rows in args.rows:
+            for case in args.cases:
+                result = run_in_subprocess(case, rows, args.seed, data_dir, args.repeat)
+                key = f"{case}@{rows}"
+                results[key] = result
+                print(f"{key:<22} {result['seconds']:>9.3f} {result['rows_per_sec']:>14,.0f} "
+                      f"{result['peak_rss_bytes'] / 1024 / 1024:>8.1f} MiB")
+
+    report = {
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as outfile:
+            json.dump(report, outfile, indent=2)
+        print(f"Results saved in {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as infile:
+            regressions = compare(results, json.load(infile)['results'], args.max_regression)
+        for key in regressions:
+            print(f"FAIL: {key} is more than {args.max_regression:.0%} slower than the baseline")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import List, Optional
+from models import Transaction
+from fileio import atomic_write
+from parser.parser import TransactionParser
+
+CACHE_VERSION = 3
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def file_digest(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, mode="rb") as infile:
+        for chunk in iter(lambda: infile.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ParseCache:
+    """On-disk cache of parsed transactions keyed by file content and parser config.
+
+    Entries are zlib-compressed pickles; the least recently used ones are evicted
+    once the directory grows past ``max_bytes``.
+    """
+    
+    SUFFIX = ".bin"
+    
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def key_for(self, parser: TransactionParser, filepath: str) -> str:
+        identity = {
+            'version': CACHE_VERSION,
+            'parser': f"{type(parser).__module__}.{type(parser).__qualname__}",
+            'config': parser.get_cache_config(),
+            'content': file_digest(filepath)
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[Transaction]]:
+        entry = self._entry_path(key)
+        try:
+            with open(entry, mode="rb") as infile:
+                transactions = pickle.loads(zlib.decompress(infile.read()))
+            os.utime(entry)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            entry.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return transactions
+    
+    def put(self, key: str, transactions: List[Transaction]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        payload = zlib.compress(pickle.dumps(transactions, protocol=pickle.HIGHEST_PROTOCOL))
+        
+        with atomic_write(str(self._entry_path(key))) as outfile:
+            outfile.write(payload)
+        
+        self.evict()
+    
+    def evict(self):
+        entries = []
+        for entry in self.directory.glob(f"*{self.SUFFIX}"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+    
+    def clear(self):
+        if not self.directory.exists():
+            return
+        for entry in self.directory.glob(f"*{self.SUFFIX}"):
+            entry.unlink(missing_ok=True)
+    
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.SUFFIX}"
@@ -0,0 +1,124 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models import Transaction
+from dedup import normalize_description
+
+UNCATEGORIZED = "Uncategorized"
+
+@dataclass(frozen=True)
+class CategoryRule:
+    """Assigns ``category`` when a keyword or ``pattern`` matches the normalized description.
+
+    ``sources`` limits the rule to some sources, by parser name (``paypal``) or
+    by prefix without brackets (``split``); an empty tuple matches every source.
+    """
+    category: str
+    keywords: Tuple[str, ...] = ()
+    pattern: Optional[str] = None
+    sources: Tuple[str, ...] = ()
+    
+    def applies_to(self, source_names: Tuple[str, ...]) -> bool:
+        return not self.sources or any(source.lower() in source_names for source in self.sources)
+
+class Categorizer:
+    """Tags transactions with the category of the rule matching their description.
+
+    Keyword rules are indexed per source in a dict keyed by the keyword's
+    normalized words, so a description costs a few lookups per word however
+    many rules there are; only ``pattern`` rules go through one combined
+    regular expression, with a named group per rule read back by
+    ``lastgroup``. When several rules match, the one matching earliest in the
+    description wins, then the one listed first. Results are memoized per
+    source and description, and on a miss per normalized description, since
+    merchant names repeat heavily.
+    """
+    
+    def __init__(self, rules: List[CategoryRule], default: Optional[str] = None):
+        self.rules = [rule for rule in rules if rule.keywords or rule.pattern]
+        self.default = default
+        self._matchers: Dict[tuple, Optional[tuple]] = {}
+        self._memo: Dict[tuple, Optional[str]] = {}
+        self._normalized_memo: Dict[tuple, Optional[str]] = {}
+    
+    @classmethod
+    def from_file(cls, path: str) -> "Categorizer":
+        """Load ``{"default": ..., "rules": [{"category", "keywords", "pattern", "sources"}, ...]}``."""
+        with open(path, mode="r", encoding="utf-8") as infile:
+            config = json.load(infile)
+        
+        rules = [CategoryRule(category=entry["category"],
+                              keywords=tuple(entry.get("keywords", ())),
+                              pattern=entry.get("pattern"),
+                              sources=tuple(entry.get("sources", ())))
+                 for entry in config.get("rules", [])]
+        return cls(rules, config.get("default"))
+    
+    def categorize(self, transaction: Transaction) -> Optional[str]:
+        source = (transaction.source_type, transaction.source_prefix)
+        key = (source, transaction.description)
+        category = self._memo.get(key, False)
+        if category is False:
+            category = self._memo[key] = self._categorize_normalized(source, normalize_description(transaction.description))
+        return category
+    
+    def _categorize_normalized(self, source: tuple, description: str) -> Optional[str]:
+        key = (source, description)
+        if key not in self._normalized_memo:
+            matcher = self._matchers.get(source, False)
+            if matcher is False:
+                matcher = self._matchers[source] = self._compile(*source)
+            
+            rule_index = self._match(matcher, description) if matcher is not None else None
+            self._normalized_memo[key] = self.rules[rule_index].category if rule_index is not None else self.default
+        return self._normalized_memo[key]
+    
+    def tag(self, transactions: Iterable[Transaction]) -> Iterator[Transaction]:
+        for transaction in transactions:
+            transaction.category = self.categorize(transaction)
+            yield transaction
+    
+    @staticmethod
+    def _match(matcher: tuple, description: str) -> Optional[int]:
+        """Index of the rule matching earliest in ``description``, the first listed on ties."""
+        keywords, lengths, patterns = matcher
+        best = None
+        if patterns is not None:
+            match = patterns.search(description)
+            if match:
+                best = (match.start(), int(match.lastgroup[1:]))
+        
+        if keywords:
+            words = description.split(" ")
+            offset = 0
+            for start in range(len(words)):
+                if best is not None and offset > best[0]:
+                    break
+                found = [keywords[key] for key in (tuple(words[start:start + length]) for length in lengths
+                                                   if start + length <= len(words)) if key in keywords]
+                if found:
+                    best = min(best, (offset, min(found))) if best is not None else (offset, min(found))
+                    break
+                offset += len(words[start]) + 1
+        return best[1] if best is not None else None
+    
+    def _compile(self, source_type, source_prefix: str) -> Optional[tuple]:
+        """``(keyword words -> first rule index, keyword lengths, pattern regex)`` of the rules of a source."""
+        source_names = (source_type.name.lower(), source_prefix.strip("()").lower())
+        keywords: Dict[Tuple[str, ...], int] = {}
+        groups = []
+        for index, rule in enumerate(self.rules):
+            if not rule.applies_to(source_names):
+                continue
+            for keyword in rule.keywords:
+                words = tuple(normalize_description(keyword).split())
+                if words:
+                    keywords.setdefault(words, index)
+            if rule.pattern:
+                groups.append(f"(?P<r{index}>{rule.pattern})")
+        
+        if not keywords and not groups:
+            return None
+        patterns = re.compile("|".join(groups), re.IGNORECASE) if groups else None
+        return keywords, sorted({len(words) for words in keywords}), patterns
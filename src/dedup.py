@@ -0,0 +1,67 @@
+import re
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Tuple
+from models import Transaction
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def normalize_description(description: str) -> str:
+    return " ".join(WORD_PATTERN.findall(description.lower()))
+
+class TransactionDeduplicator:
+    """Drops transactions already seen in another input file.
+
+    Transactions are indexed by day and then by (amount in cents, normalized
+    description). A transaction from a different file of the same source must
+    match on the exact day; one from a different source may be up to
+    ``date_tolerance_days`` away. Every indexed transaction absorbs at most one
+    duplicate, and transactions of the same file never match each other.
+    """
+    
+    def __init__(self, date_tolerance_days: int = 0):
+        self.date_tolerance_days = date_tolerance_days
+        self.dropped = Counter()
+    
+    def filter(self, tagged_transactions: Iterable[Tuple[Transaction, int]]) -> Iterator[Transaction]:
+        """Yield unique transactions from ``(transaction, file index)`` pairs ordered by month."""
+        index: Dict[int, Dict[tuple, List[Tuple[int, Transaction]]]] = {}
+        current_month = None
+        
+        for transaction, file_index in tagged_transactions:
+            if transaction.month_ordinal != current_month:
+                current_month = transaction.month_ordinal
+                self._evict_before(index, current_month)
+            
+            day = transaction.date.toordinal()
+            key = (transaction.amount_cents, normalize_description(transaction.description))
+            
+            if self._take_match(index, day, key, transaction, file_index):
+                self.dropped[transaction.source_type.name] += 1
+                continue
+            
+            index.setdefault(day, {}).setdefault(key, []).append((file_index, transaction))
+            yield transaction
+    
+    def _take_match(self, index, day: int, key: tuple, transaction: Transaction, file_index: int) -> bool:
+        tolerance = self.date_tolerance_days
+        for candidate_day in range(day - tolerance, day + tolerance + 1):
+            entries = index.get(candidate_day, {}).get(key)
+            if not entries:
+                continue
+            
+            for i, (other_index, other) in enumerate(entries):
+                if other_index == file_index:
+                    continue
+                if other.source_type == transaction.source_type and candidate_day != day:
+                    continue
+                del entries[i]
+                return True
+        
+        return False
+    
+    def _evict_before(self, index, month_ordinal: int):
+        """Forget days that no transaction of ``month_ordinal`` or later can match."""
+        first_day = date(month_ordinal // 12, month_ordinal % 12 + 1, 1).toordinal()
+        for day in [day for day in index if day < first_day - self.date_tolerance_days]:
+            del index[day]
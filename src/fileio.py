@@ -0,0 +1,128 @@
+import gzip
+import io
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, TextIO, Union
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+Source = Union[str, os.PathLike, bytes, bytearray, BinaryIO]
+
+COMPRESSIONS = {
+    ".gz": "gzip",
+    ".zst": "zstd"
+}
+
+def compression_for(path: str) -> Optional[str]:
+    return COMPRESSIONS.get(Path(path).suffix.lower())
+
+@contextmanager
+def atomic_write(path: str, buffering: int = -1) -> Iterator[BinaryIO]:
+    """Write to a temporary file next to ``path`` and ``os.replace`` it on success.
+
+    On any error the temporary file is removed and ``path`` is left untouched.
+    An existing ``path`` keeps its permissions; a new one gets the default
+    permissions of the process umask.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode="wb", buffering=buffering) as outfile:
+            yield outfile
+        os.chmod(tmp_path, _replaced_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+@contextmanager
+def open_text_output(path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[TextIO]:
+    """Atomically written UTF-8 text, compressed when ``path`` ends in ``.gz`` or ``.zst``."""
+    with atomic_write(path, buffering=buffer_size) as raw:
+        compression = compression_for(path)
+        if compression == "gzip":
+            binary = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+        elif compression == "zstd":
+            binary = _zstandard().ZstdCompressor().stream_writer(raw)
+        else:
+            binary = raw
+        
+        with io.TextIOWrapper(binary, encoding="utf-8", newline="") as text:
+            yield text
+
+@contextmanager
+def open_text_input(path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[TextIO]:
+    with open(path, mode="rb", buffering=buffer_size) as raw:
+        compression = compression_for(path)
+        if compression == "gzip":
+            binary = gzip.GzipFile(fileobj=raw, mode="rb")
+        elif compression == "zstd":
+            binary = _zstandard().ZstdDecompressor().stream_reader(raw)
+        else:
+            binary = raw
+        
+        with io.TextIOWrapper(binary, encoding="utf-8", newline="") as text:
+            yield text
+
+def is_path(source: Source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+def source_name(source: Source) -> str:
+    """Printable name of a path, an uploaded file object or in-memory bytes."""
+    if is_path(source):
+        return os.fspath(source)
+    return str(getattr(source, "name", "<in-memory upload>"))
+
+@contextmanager
+def open_source_binary(source: Source) -> Iterator[Union[str, BinaryIO]]:
+    """The path itself, or a binary file object over bytes or an upload, for readers like openpyxl."""
+    if is_path(source):
+        yield os.fspath(source)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        with io.BytesIO(source) as binary:
+            yield binary
+    else:
+        yield source
+
+@contextmanager
+def open_source_text(source: Source, encoding: str = "utf-8") -> Iterator[TextIO]:
+    """Text over a path, bytes or a binary file object, with the newline handling of ``open``.
+
+    A caller's file object is left open.
+    """
+    if is_path(source):
+        with open(source, mode="r", encoding=encoding) as text:
+            yield text
+        return
+    
+    with open_source_binary(source) as binary:
+        text = io.TextIOWrapper(binary, encoding=encoding)
+        try:
+            yield text
+        finally:
+            text.detach()
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+# Reading the umask means setting it, which races with other threads; read it once, at import
+_UMASK = _current_umask()
+
+def _replaced_mode(path: str) -> int:
+    """Permissions of the file at ``path``, or those ``open`` would give a new file."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression needs the 'zstandard' package (pip install zstandard)") from None
+    return zstandard
@@ -1,55 +1,299 @@
 import csv
-from typing import List
+import io
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from collections import defaultdict
-from models import Transaction, BackType
+from models import Transaction, BackType, format_cents
+from categories import UNCATEGORIZED
+from aggregates import MonthlyAggregates
+from fileio import DEFAULT_BUFFER_SIZE, atomic_write, open_text_input, open_text_output
+from instrumentation import NULL_PROFILER, Profiler
 
 class TransactionFormatter:
     
     MONTH_ORDER = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    MONTH_HEADER = "⬜⬜⬜⬜  {month}  ⬜⬜⬜⬜"
+    EURO_FORMAT = '#,##0.00 "€"'
+    XLSX_EXTENSION = ".xlsx"
+    SUBTOTAL_LABEL = "Total"
+    MONTH_HEADER_PATTERN = re.compile(r"^⬜⬜⬜⬜  ([A-Z][a-z]{2}) (\d{4})  ⬜⬜⬜⬜$")
     
-    def format_transactions(self, transactions: List[Transaction]) -> List[List[str]]:
-        grouped = self._group_transactions_by_month(transactions)
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE, profiler: Profiler = NULL_PROFILER,
+                 category_subtotals: bool = False, subtotals: bool = False, aggregates: Optional[MonthlyAggregates] = None):
+        """``subtotals`` ends every month with its total per source and overall;
+        ``aggregates``, when given, is filled with the per-month totals while formatting."""
+        self.buffer_size = buffer_size
+        self.profiler = profiler
+        self.category_subtotals = category_subtotals
+        self.subtotals = subtotals
+        self.aggregates = aggregates if aggregates is not None or not subtotals else MonthlyAggregates()
+    
+    def copy(self) -> "TransactionFormatter":
+        """A formatter with the same settings and its own aggregates, safe to use on another thread."""
+        return type(self)(self.buffer_size, self.profiler, self.category_subtotals, self.subtotals,
+                          MonthlyAggregates() if self.aggregates is not None else None)
+    
+    @property
+    def has_total_rows(self) -> bool:
+        return self.subtotals or self.category_subtotals
+    
+    def format_transactions(self, transactions: Iterable[Transaction]) -> List[List[str]]:
+        return list(self.iter_formatted_rows(transactions))
+    
+    def iter_formatted_rows(self, transactions: Iterable[Transaction], presorted: bool = False) -> Iterator[List[str]]:
+        """Yield the output rows one at a time.
+
+        With ``presorted`` the transactions must already be ordered by month, as
+        the processor's merged stream is, and only one month is held at a time.
+        """
+        profiler = self.profiler
+        for month, month_transactions in profiler.iter_stage("format.group", self._iter_month_groups(transactions, presorted)):
+            with profiler.stage("format.render"):
+                if self.aggregates is not None:
+                    self.aggregates.set_month(month, month_transactions)
+                rows = list(self._render_block(month, [[transaction.to_csv_row() for transaction in transactions_of_type]
+                                                       for transactions_of_type in month_transactions.values()]))
+                if self.has_total_rows:
+                    rows.append([""])
+                    rows.extend([label, category, format_cents(cents), self.MONTH_ORDER[month % 12]]
+                                for label, category, cents in self._total_rows(month, month_transactions))
+            profiler.count("format.rows_out", len(rows))
+            yield from rows
+    
+    def merge_transactions(self, formatted_rows: List[List[str]], transactions: Iterable[Transaction],
+                           source_order: Optional[List[str]] = None) -> List[List[str]]:
+        """Insert ``transactions`` into the month blocks of already formatted rows.
+
+        A source new to a month gets its group placed by ``source_order``, the
+        source prefixes in mapping order, as a full run would have placed it.
+        """
+        blocks = self._parse_blocks(formatted_rows)
+        source_order = source_order or []
         
-        sorted_months = self._sort_months(grouped.keys())
+        def rank(group: List[List[str]]) -> int:
+            return next((i for i, prefix in enumerate(source_order) if group[0][0].startswith(f"{prefix} ")),
+                        len(source_order))
         
+        for month, month_transactions in self._group_transactions_by_month(transactions).items():
+            groups = [group for group in blocks.setdefault(month, []) if group]
+            blocks[month] = groups
+            
+            for transactions_of_type in month_transactions.values():
+                source_prefix = transactions_of_type[0].source_prefix
+                group = next((g for g in groups if g[0][0].startswith(f"{source_prefix} ")), None)
+                if group is None:
+                    new_rank = source_order.index(source_prefix) if source_prefix in source_order else len(source_order)
+                    group = []
+                    groups.insert(next((i for i, g in enumerate(groups) if rank(g) > new_rank), len(groups)), group)
+                group.extend(transaction.to_csv_row() for transaction in transactions_of_type)
+        
+        return self._render_blocks(blocks)
+    
+    def _render_blocks(self, blocks: Dict[int, List[List[List[str]]]]) -> List[List[str]]:
         formatted_rows = []
+        for month in sorted(blocks):
+            formatted_rows.extend(self._render_block(month, blocks[month]))
+        return formatted_rows
+    
+    def _render_block(self, month: int, groups: List[List[List[str]]]) -> Iterator[List[str]]:
+        yield [self.MONTH_HEADER.format(month=self.month_label(month))]
         
-        for month in sorted_months:
-            formatted_rows.append([f"⬜⬜⬜⬜  {month}  ⬜⬜⬜⬜"])
-            
-            month_transactions = grouped[month]
-            
-            transaction_types = list(month_transactions.keys())
+        groups = [group for group in groups if group]
+        
+        for i, group in enumerate(groups):
+            yield from group
             
-            for i, transaction_type in enumerate(transaction_types):
-                transactions_of_type = month_transactions[transaction_type]
-                
-                for transaction in transactions_of_type:
-                    formatted_rows.append(transaction.to_csv_row())
-                
-                if i < len(transaction_types) - 1 and transactions_of_type:
-                    formatted_rows.append([""])
+            if i < len(groups) - 1:
+                yield [""]
+    
+    def _parse_blocks(self, formatted_rows: List[List[str]]) -> Dict[int, List[List[List[str]]]]:
+        blocks = {}
+        groups = None
         
-        return formatted_rows
+        for row in formatted_rows:
+            header = self.MONTH_HEADER_PATTERN.match(row[0]) if len(row) == 1 else None
+            if header:
+                month = int(header.group(2)) * 12 + self.MONTH_ORDER.index(header.group(1))
+                groups = blocks.setdefault(month, [])
+                groups.append([])
+            elif row[0].startswith("⬜"):
+                raise ValueError(f"Unrecognized month header {row[0]!r}, regenerate the output without --incremental")
+            elif groups is None:
+                continue
+            elif not any(row):
+                groups.append([])
+            else:
+                groups[-1].append(row)
+        
+        return blocks
     
-    def _group_transactions_by_month(self, transactions: List[Transaction]) -> dict:
+    def _group_transactions_by_month(self, transactions: Iterable[Transaction]) -> dict:
+        """Group on the (year, month) ordinal in one pass, keeping source order inside a month."""
         grouped = defaultdict(lambda: defaultdict(list))
         
         for transaction in transactions:
-            month = transaction.month_name
-            grouped[month][transaction.source_type].append(transaction)
+            grouped[transaction.month_ordinal][transaction.source_type].append(transaction)
         
         return dict(grouped)
     
-    def _sort_months(self, months: set) -> List[str]:
-        return sorted(months, key=lambda x: self.MONTH_ORDER.index(x))
+    def _iter_month_groups(self, transactions: Iterable[Transaction], presorted: bool = False) -> Iterator[Tuple[int, dict]]:
+        if not presorted:
+            grouped = self._group_transactions_by_month(transactions)
+            for month in sorted(grouped):
+                yield month, grouped[month]
+            return
+        
+        current, groups = None, None
+        for transaction in transactions:
+            month = transaction.month_ordinal
+            if month != current:
+                if current is not None:
+                    if month < current:
+                        raise ValueError("Transactions are not sorted by month")
+                    yield current, groups
+                current, groups = month, defaultdict(list)
+            groups[transaction.source_type].append(transaction)
+        
+        if current is not None:
+            yield current, groups
+    
+    def _total_rows(self, month: int, month_transactions: dict) -> List[Tuple[str, str, int]]:
+        """``(label, category, cents)`` of the total rows closing a month block."""
+        rows = []
+        if self.subtotals:
+            month_cents = self.aggregates.cents[month]
+            rows.extend((f"{self.SUBTOTAL_LABEL} {self.aggregates.prefixes[source]}", "", cents)
+                        for source, cents in month_cents.items())
+            rows.append((self.SUBTOTAL_LABEL, "", sum(month_cents.values())))
+        
+        if self.category_subtotals:
+            totals = defaultdict(int)
+            for transactions_of_type in month_transactions.values():
+                for transaction in transactions_of_type:
+                    totals[transaction.category or UNCATEGORIZED] += abs(transaction.amount_cents)
+            rows.extend((self.SUBTOTAL_LABEL, category, cents) for category, cents in sorted(totals.items()))
+        return rows
+    
+    def month_label(self, month_ordinal: int) -> str:
+        return f"{self.MONTH_ORDER[month_ordinal % 12]} {month_ordinal // 12}"
+    
+    def is_xlsx(self, output_file: str) -> bool:
+        return output_file.lower().endswith(self.XLSX_EXTENSION)
     
-    def write_to_csv(self, formatted_rows: List[List[str]], output_file: str):
+    def write_to_xlsx(self, transactions: Iterable[Transaction], output_file: str, presorted: bool = False):
+        """Write one sheet per year with numeric, euro-formatted amount cells.
+
+        The workbook is opened in write-only mode, so rows are streamed to disk
+        instead of being kept in memory.
+        """
+        try:
+            with self.profiler.stage("format.write"):
+                workbook = self._build_workbook(transactions, presorted)
+                with atomic_write(output_file, buffering=self.buffer_size) as outfile:
+                    workbook.save(outfile)
+            print(f"Output saved in {output_file}")
+        except Exception as e:
+            print(f"Errore save file: {e}")
+            raise
+    
+    def write_members_xlsx(self, transactions_by_member: Dict[str, List[Transaction]], output_file: str):
+        """Write one sheet per member, each holding the month blocks of that member's transactions."""
+        import openpyxl
+        
+        try:
+            with self.profiler.stage("format.write"):
+                workbook = openpyxl.Workbook(write_only=True)
+                for member, transactions in transactions_by_member.items():
+                    worksheet = workbook.create_sheet(self.sheet_title(member))
+                    self._append_months(workbook, worksheet, transactions, True, lambda month, title=worksheet.title: title)
+                if not transactions_by_member:
+                    workbook.create_sheet()
+                with atomic_write(output_file, buffering=self.buffer_size) as outfile:
+                    workbook.save(outfile)
+            print(f"Output saved in {output_file}")
+        except Exception as e:
+            print(f"Errore save file: {e}")
+            raise
+    
+    @staticmethod
+    def sheet_title(name: str) -> str:
+        """``name`` without the characters Excel forbids in sheet titles, cut to 31 characters."""
+        return re.sub(r"[\\/*?:\[\]]", "_", name)[:31] or "Sheet"
+    
+    def to_xlsx_bytes(self, transactions: Iterable[Transaction], presorted: bool = False) -> bytes:
+        """The workbook of ``write_to_xlsx`` in memory, without touching the output directory."""
+        with self.profiler.stage("format.write"), io.BytesIO() as buffer:
+            self._build_workbook(transactions, presorted).save(buffer)
+            return buffer.getvalue()
+    
+    def _build_workbook(self, transactions: Iterable[Transaction], presorted: bool):
+        import openpyxl
+        
+        workbook = openpyxl.Workbook(write_only=True)
+        if self._append_months(workbook, None, transactions, presorted, lambda month: str(month // 12)) is None:
+            workbook.create_sheet()
+        return workbook
+    
+    def _append_months(self, workbook, worksheet, transactions: Iterable[Transaction], presorted: bool, sheet_title):
+        """Append the month blocks to ``worksheet``, opening a new sheet whenever ``sheet_title(month)`` changes."""
+        for month, month_transactions in self.profiler.iter_stage("format.group", self._iter_month_groups(transactions, presorted)):
+            if self.aggregates is not None:
+                self.aggregates.set_month(month, month_transactions)
+            title = sheet_title(month)
+            if worksheet is None or worksheet.title != title:
+                worksheet = workbook.create_sheet(title)
+            
+            worksheet.append([self.MONTH_HEADER.format(month=self.month_label(month))])
+            
+            groups = list(month_transactions.values())
+            for i, transactions_of_type in enumerate(groups):
+                for transaction in transactions_of_type:
+                    worksheet.append(self._xlsx_row(worksheet, transaction))
+                
+                if i < len(groups) - 1:
+                    worksheet.append([])
+            self.profiler.count("format.rows_out", sum(map(len, groups)) + len(groups))
+            
+            if self.has_total_rows:
+                total_rows = self._total_rows(month, month_transactions)
+                worksheet.append([])
+                for label, category, cents in total_rows:
+                    worksheet.append([label, category or None, self._xlsx_amount(worksheet, cents),
+                                      self.MONTH_ORDER[month % 12]])
+                self.profiler.count("format.rows_out", len(total_rows) + 1)
+        return worksheet
+    
+    def _xlsx_row(self, worksheet, transaction: Transaction) -> list:
+        return [f"{transaction.source_prefix} {transaction.description}", transaction.category,
+                self._xlsx_amount(worksheet, transaction.amount_cents), transaction.month_name]
+    
+    def _xlsx_amount(self, worksheet, cents: int):
+        from openpyxl.cell import WriteOnlyCell
+        
+        amount = WriteOnlyCell(worksheet, value=abs(cents) / 100)
+        amount.number_format = self.EURO_FORMAT
+        return amount
+    
+    def read_csv(self, input_file: str) -> List[List[str]]:
+        with open_text_input(input_file, self.buffer_size) as infile:
+            return list(csv.reader(infile, delimiter=";"))
+    
+    def write_to_csv(self, formatted_rows: Iterable[List[str]], output_file: str):
+        """Write the rows to a temporary file and atomically move it over ``output_file``.
+
+        ``.gz`` and ``.zst`` outputs are compressed while writing.
+        """
         try:
-            with open(output_file, mode="w", encoding="utf-8", newline="") as outfile:
+            with self.profiler.stage("format.write"), open_text_output(output_file, self.buffer_size) as outfile:
                 writer = csv.writer(outfile, delimiter=";")
                 writer.writerows(formatted_rows)
             print(f"Output saved in {output_file}")
         except Exception as e:
             print(f"Errore save file: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def to_csv_bytes(self, formatted_rows: Iterable[List[str]]) -> bytes:
+        """The UTF-8 content ``write_to_csv`` would write, built in memory."""
+        with self.profiler.stage("format.write"), io.StringIO(newline="") as buffer:
+            csv.writer(buffer, delimiter=";").writerows(formatted_rows)
+            return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,99 @@
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+from models import Transaction
+from fileio import atomic_write
+
+class IncrementalState:
+    """High-water mark per parser, kept in a JSON sidecar next to the output file.
+
+    A mark is the date of the newest transaction already written plus the
+    fingerprints of every transaction on that date, so rows sharing the last
+    date are neither dropped nor written twice. The sidecar also records the
+    size and modification time of the output it describes, so a sidecar that
+    does not belong to the output on disk is never trusted.
+    """
+    
+    SUFFIX = ".state.json"
+    
+    def __init__(self, path: str, marks: Dict[str, dict] = None, output_signature: Optional[str] = None):
+        self.path = path
+        self.output_signature = output_signature
+        self.previous = marks or {}
+        self._latest = {name: [datetime.fromisoformat(mark["date"]), list(mark["fingerprints"])]
+                        for name, mark in self.previous.items()}
+    
+    @classmethod
+    def for_output(cls, output_file: str) -> "IncrementalState":
+        path = output_file + cls.SUFFIX
+        if not os.path.exists(path):
+            return cls(path)
+        
+        with open(path, mode="r", encoding="utf-8") as infile:
+            data = json.load(infile)
+        if not isinstance(data, dict) or not isinstance(data.get("marks"), dict):
+            return cls(path)
+        return cls(path, data["marks"], data.get("output"))
+    
+    @classmethod
+    def discard(cls, output_file: str):
+        """Remove the sidecar of ``output_file``, once a full run has rewritten it."""
+        path = output_file + cls.SUFFIX
+        if os.path.exists(path):
+            os.remove(path)
+    
+    @property
+    def marks(self) -> Dict[str, dict]:
+        return {name: {'date': date.isoformat(), 'fingerprints': fingerprints}
+                for name, (date, fingerprints) in self._latest.items()}
+    
+    def since(self, source_name: str) -> Optional[datetime]:
+        """Date of the loaded mark of ``source_name``; earlier rows are already in the output."""
+        mark = self.previous.get(source_name)
+        return datetime.fromisoformat(mark["date"]) if mark else None
+    
+    def matches(self, output_file: str) -> bool:
+        """Whether this state was saved together with ``output_file`` as it is now."""
+        return self.output_signature is not None and self._signature(output_file) == self.output_signature
+    
+    def save(self, output_file: str):
+        state = {'output': self._signature(output_file), 'marks': self.marks}
+        with atomic_write(self.path) as outfile:
+            outfile.write(json.dumps(state, indent=2).encode("utf-8"))
+    
+    @staticmethod
+    def _signature(output_file: str) -> str:
+        """Size and modification time of the output, checked without reading it."""
+        stat = os.stat(output_file)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    
+    def filter_new(self, source_name: str, transactions: Iterable[Transaction]) -> Iterator[Transaction]:
+        """Yield the transactions past the mark of ``source_name`` and advance the mark.
+
+        ``transactions`` must be sorted by date, as parser streams are. Every
+        file of a parser shares its mark: each one is filtered against the mark
+        loaded from disk, and the new mark covers all of them.
+        """
+        mark = self.previous.get(source_name)
+        mark_date = self.since(source_name)
+        seen = Counter(mark["fingerprints"]) if mark else Counter()
+        
+        for transaction in transactions:
+            fingerprint = transaction.fingerprint()
+            
+            if mark_date is not None and transaction.date < mark_date:
+                continue
+            
+            if transaction.date == mark_date and seen[fingerprint] > 0:
+                seen[fingerprint] -= 1
+                continue
+            
+            latest = self._latest.get(source_name)
+            if latest is None or transaction.date > latest[0]:
+                self._latest[source_name] = [transaction.date, [fingerprint]]
+            elif transaction.date == latest[0]:
+                latest[1].append(fingerprint)
+            
+            yield transaction
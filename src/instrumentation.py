@@ -0,0 +1,167 @@
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class RowStats:
+    """Per-row timers and counters a parser fills while it reads one file."""
+    
+    __slots__ = ('decode', 'filter', 'build', 'rows_in', 'filtered')
+    
+    def __init__(self):
+        self.decode = self.filter = self.build = 0.0
+        self.rows_in = self.filtered = 0
+
+class Profiler:
+    """Collects exclusive time per pipeline stage plus row counters.
+
+    Stages nest: time spent in an inner stage is not counted in the outer one,
+    which keeps the numbers meaningful when lazy generators (parsers feeding
+    the formatter feeding the writer) interleave. Every thread has its own
+    stage stack; a profiler pickled into a worker process becomes a no-op.
+    """
+    
+    enabled = True
+    
+    def __init__(self):
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+    
+    def __reduce__(self):
+        return NullProfiler, ()
+    
+    @property
+    def _stack(self) -> List[list]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def clock(self) -> float:
+        return time.perf_counter()
+    
+    def begin(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+    
+    def end(self):
+        stack = self._stack
+        name, started, child_time = stack.pop()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.timings[name] += elapsed - child_time
+        if stack:
+            stack[-1][2] += elapsed
+    
+    @contextmanager
+    def stage(self, name: str):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+    
+    def iter_stage(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from ``iterable``, charging the time of every ``next()`` to ``name``."""
+        iterator = iter(iterable)
+        while True:
+            self.begin(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.end()
+            yield item
+    
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+    
+    def row_stats(self) -> RowStats:
+        return RowStats()
+    
+    def record_rows(self, name: str, stats: RowStats):
+        """Add a parser's row stats; its per-row time is moved out of the enclosing stage."""
+        stack = self._stack
+        if stack:
+            stack[-1][2] += stats.decode + stats.filter + stats.build
+        
+        with self._lock:
+            self.timings[f"{name}.decode"] += stats.decode
+            self.timings[f"{name}.filter"] += stats.filter
+            self.timings[f"{name}.build"] += stats.build
+            self.counters[f"{name}.rows_in"] += stats.rows_in
+            self.counters[f"{name}.rows_filtered"] += stats.filtered
+            self.counters[f"{name}.rows_out"] += stats.rows_in - stats.filtered
+    
+    def peak_memory_bytes(self) -> int:
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    
+    def report(self) -> dict:
+        return {
+            'wall_seconds': time.perf_counter() - self._started,
+            'stages': {name: seconds for name, seconds in sorted(self.timings.items())},
+            'counters': dict(sorted(self.counters.items())),
+            'peak_memory_bytes': self.peak_memory_bytes()
+        }
+    
+    def format_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+    
+    def format_table(self) -> str:
+        report = self.report()
+        lines = [f"{'Stage':<28} {'Seconds':>10}"]
+        lines.extend(f"{name:<28} {seconds:>10.4f}" for name, seconds in report['stages'].items())
+        lines.append("")
+        lines.append(f"{'Counter':<28} {'Value':>10}")
+        lines.extend(f"{name:<28} {value:>10}" for name, value in report['counters'].items())
+        lines.append("")
+        lines.append(f"{'wall time':<28} {report['wall_seconds']:>10.4f}")
+        lines.append(f"{'peak memory (MiB)':<28} {report['peak_memory_bytes'] / 1024 / 1024:>10.1f}")
+        return "\n".join(lines)
+
+class NullProfiler(Profiler):
+    """Default profiler: every hook is a no-op."""
+    
+    enabled = False
+    
+    def __init__(self):
+        pass
+    
+    def clock(self) -> float:
+        return 0.0
+    
+    def begin(self, name: str):
+        pass
+    
+    def end(self):
+        pass
+    
+    @contextmanager
+    def stage(self, name: str):
+        yield
+    
+    def iter_stage(self, name: str, iterable: Iterable) -> Iterable:
+        return iterable
+    
+    def count(self, name: str, amount: int = 1):
+        pass
+    
+    def record_rows(self, name: str, stats: RowStats):
+        pass
+
+NULL_PROFILER = NullProfiler()
@@ -4,90 +4,277 @@ import sys
 import argparse
 from pathlib import Path
 from processor import TransactionProcessor
-from parser.satispay_parser import SatispayParser
-from parser.splitwise_parser import SplitwiseParser
-from parser.paypal_parser import PaypalParser
+from cache import ParseCache
+from formatter import TransactionFormatter
+from fileio import DEFAULT_BUFFER_SIZE
+from dedup import TransactionDeduplicator
+from batch import load_manifest, run_batch, print_report
+from parser.registry import ParserRegistry
+from parser.detect import SourceDetector, expand_inputs
+from watcher import WatchSession
+from instrumentation import NULL_PROFILER, Profiler
+from store import TransactionStore
+from categories import Categorizer
+from aggregates import MonthlyAggregates
 
 DIRECTORY = "../resources/"
 DEFAULT_SPLITWISE_FILE = DIRECTORY + "slitwise.csv"
 DEFAULT_PAYPAL_FILE = DIRECTORY + "paypal.csv"
 DEFAULT_SATYSPAY_FILE = DIRECTORY + "satispay.xlsx"
 DEFAULT_OUTPUT_FILE = "../output/output.csv"
-DEFAULT_ONWER = "christian rocchetti"
+DEFAULT_CACHE_DIR = "../cache/"
+DETECTION_CACHE_FILE = "detected-sources.json"
+DEFAULT_FILES = {
+    'splitwise': DEFAULT_SPLITWISE_FILE,
+    'paypal': DEFAULT_PAYPAL_FILE,
+    'satispay': DEFAULT_SATYSPAY_FILE
+}
 
 
-def parse_arguments():
-    parser = argparse.ArgumentParser(description="Process Splitwise and PayPal CSV files")
+def load_registry() -> ParserRegistry:
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    pre_parser.add_argument('--parsers-config', type=str)
+    known, _ = pre_parser.parse_known_args()
     
-    parser.add_argument('--splitwise', type=str, default=DEFAULT_SPLITWISE_FILE,
-                       help=f'Splitwise CSV file (default: {DEFAULT_SPLITWISE_FILE})')
-    
-    parser.add_argument('--splitwise-onwer', type=str, default=DEFAULT_ONWER,
-                       help=f'Splitwise onwe (default: {DEFAULT_ONWER})')
+    registry = ParserRegistry()
+    if known.parsers_config:
+        registry.load_config(known.parsers_config)
+    return registry
+
+def option_dest(flag: str) -> str:
+    return flag.lstrip('-').replace('-', '_')
+
+def parse_arguments(registry: ParserRegistry):
+    parser = argparse.ArgumentParser(description="Process Splitwise, PayPal and Satispay statements")
     
-    parser.add_argument('--paypal', type=str, default=DEFAULT_PAYPAL_FILE,
-                       help=f'PayPal CSV file (default: {DEFAULT_PAYPAL_FILE})')
+    parser.add_argument('--parsers-config', type=str,
+                       help='JSON file registering additional parsers')
     
-    parser.add_argument('--satispay', type=str, default=DEFAULT_SATYSPAY_FILE,
-                       help=f'Satispay CSV file (default: {DEFAULT_SATYSPAY_FILE})')
+    for spec in registry:
+        default_file = DEFAULT_FILES.get(spec.name, spec.default_file)
+        parser.add_argument(f'--{spec.name}', type=str, nargs='+', default=default_file,
+                           help=f'{spec.label} file(s) (default: {default_file})')
+        
+        for option in spec.options:
+            parser.add_argument(option.flag, type=str, default=option.default,
+                               help=f'{option.help} (default: {option.default})')
     
     parser.add_argument('-o', '--output', type=str, default=DEFAULT_OUTPUT_FILE,
-                       help=f'Output file (default: {DEFAULT_OUTPUT_FILE})')
+                       help=f'Output file, .xlsx writes an Excel workbook with one sheet per year and .gz/.zst compress the CSV (default: {DEFAULT_OUTPUT_FILE})')
     
-    parser.add_argument('--skip-splitwise', action='store_true', help='Skip Splitwise processing')
-    parser.add_argument('--skip-paypal', action='store_true', help='Skip PayPal processing')
-    parser.add_argument('--skip-satispay', action='store_true', help='Skip Satispay processing')
+    parser.add_argument('--buffer-size', type=int, default=DEFAULT_BUFFER_SIZE,
+                       help=f'Output write buffer in bytes (default: {DEFAULT_BUFFER_SIZE})')
     
-    return parser.parse_args()
-
-def validate_files(args):
-    files_to_check = []
+    parser.add_argument('--inbox', type=str, nargs='+', metavar='PATH',
+                       help='Directories or glob patterns of exports; each file is routed to its parser by its header')
     
-    if not args.skip_splitwise:
-        files_to_check.append(('Splitwise', args.splitwise))
+    for spec in registry:
+        parser.add_argument(f'--skip-{spec.name}', action='store_true', help=f'Skip {spec.label} processing')
     
-    if not args.skip_paypal:
-        files_to_check.append(('PayPal', args.paypal))
-
-    if not args.skip_satispay:
-        files_to_check.append(('Satispay', args.satispay))        
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only add transactions newer than the previous run to the existing output')
+    
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running and update the output whenever an input file changes')
+    parser.add_argument('--interval', type=float, default=2.0,
+                       help='Seconds between two checks of the input files in --watch mode (default: 2)')
+    
+    parser.add_argument('--store', type=str, metavar='PATH',
+                       help='SQLite database that keeps every parsed transaction; the output is written from all of it')
+    
+    parser.add_argument('--categories', type=str, metavar='RULES',
+                       help='JSON file of category rules; adds a category column and per-month category totals')
     
+    parser.add_argument('--subtotals', action='store_true',
+                       help='End every month with its total per source and overall')
+    parser.add_argument('--summary', type=str, metavar='FILE',
+                       help='Write the monthly totals per source to FILE, as CSV when it ends in .csv and JSON otherwise')
+    
+    parser.add_argument('--splitwise-members', nargs='*', metavar='NAME',
+                       help='Read the Splitwise export once and write one output per member (one sheet each for .xlsx); '
+                            'without names every member column is used')
+    
+    parser.add_argument('--dedup', action='store_true',
+                       help='Drop transactions that appear in more than one input file')
+    parser.add_argument('--dedup-days', type=int, default=1,
+                       help='Date tolerance in days when matching duplicates across sources (default: 1)')
+    
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                       help=f'Directory of the parse cache (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every file even if it did not change')
+    parser.add_argument('--clear-cache', action='store_true', help='Empty the parse cache before processing')
+    
+    parser.add_argument('--batch', type=str, metavar='MANIFEST',
+                       help='Process every job of a JSON manifest or of a directory with one folder per owner')
+    
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                       help='Parse the input files (or run the --batch jobs) concurrently with this many workers (default: 1, serial)')
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process',
+                       help='Worker pool used when --jobs is greater than 1 (default: process)')
+    
+    parser.add_argument('--profile', choices=['table', 'json'],
+                       help='Print the time spent in every pipeline stage and the row counters after the run')
+    parser.add_argument('--cprofile', type=str, metavar='FILE',
+                       help='Run under cProfile and dump the stats to FILE (read them with python -m pstats)')
+    
+    return parser.parse_args()
+
+def requested_files(args, registry: ParserRegistry) -> dict:
+    files = {}
+    for spec in registry:
+        filepaths = getattr(args, option_dest(spec.name))
+        if getattr(args, option_dest(f"skip-{spec.name}")) or not filepaths:
+            continue
+        files[spec.name] = [filepaths] if isinstance(filepaths, str) else filepaths
+    return files
+
+def validate_files(files: dict, registry: ParserRegistry) -> dict:
+    """Report missing files and return the mappings of the files that exist."""
+    file_mappings = {}
     missing_files = []
-    for file_type, filepath in files_to_check:
-        if not Path(filepath).exists():
-            missing_files.append(f"{file_type}: {filepath}")
+    for name, filepaths in files.items():
+        for filepath in filepaths:
+            if Path(filepath).exists():
+                file_mappings.setdefault(name, []).append(filepath)
+            else:
+                missing_files.append(f"{registry[name].label}: {filepath}")
     
     if missing_files:
         print("Missing files:")
         for missing in missing_files:
             print(f"  - {missing}")
         print("\nContinuing with available files...")
+    
+    return file_mappings
+
+def create_detector(args, registry: ParserRegistry) -> SourceDetector:
+    cache_path = None if args.no_cache else str(Path(args.cache_dir) / DETECTION_CACHE_FILE)
+    return SourceDetector(registry, cache_path)
+
+def detect_files(args, registry: ParserRegistry, detector: SourceDetector = None, verbose: bool = True) -> dict:
+    detector = detector or create_detector(args, registry)
+    file_mappings, unknown = detector.route(expand_inputs(args.inbox))
+    
+    if verbose:
+        for name, filepaths in file_mappings.items():
+            print(f"Detected {len(filepaths)} {registry[name].label} file(s)")
+        if unknown:
+            print("Unrecognized files:")
+            for filepath in unknown:
+                print(f"  - {filepath}")
+    
+    return {name: filepaths for name, filepaths in file_mappings.items()
+            if not getattr(args, option_dest(f"skip-{name}"))}
+
+def run_watch_mode(args, registry: ParserRegistry, processor: TransactionProcessor):
+    if args.inbox:
+        detector = create_detector(args, registry)
+        mappings_provider = lambda: detect_files(args, registry, detector, verbose=False)
+    else:
+        mappings_provider = lambda: requested_files(args, registry)
+    
+    def parser_factory(name: str):
+        return create_parsers({name: []}, args, registry)[name]
+    
+    session = WatchSession(processor, mappings_provider, args.output, args.interval, parser_factory)
+    print(f"Watching input files every {args.interval:g}s, press Ctrl+C to stop")
+    session.run()
+
+def create_parsers(file_mappings: dict, args, registry: ParserRegistry) -> dict:
+    """Instantiate, and so import, only the parsers that have a file to read."""
+    parsers = {}
+    for name in file_mappings:
+        spec = registry[name]
+        options = {option.argument: getattr(args, option_dest(option.flag)) for option in spec.options}
+        parsers[name] = spec.create(**options)
+    return parsers
+
+def run_batch_mode(args):
+    jobs = load_manifest(args.batch)
+    if not jobs:
+        print(f"No jobs found in {args.batch}")
+        return
+    
+    results = run_batch(jobs, max_workers=args.jobs)
+    print_report(results)
+    
+    if any(not result.ok for result in results):
+        sys.exit(1)
+
+def run_profiled(args, run):
+    if not args.cprofile:
+        run()
+        return
+    
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        profile.runcall(run)
+    finally:
+        profile.dump_stats(args.cprofile)
+        print(f"cProfile stats saved in {args.cprofile}")
+
+def print_profile(args, profiler: Profiler):
+    if args.profile == 'json':
+        print(profiler.format_json())
+    elif args.profile == 'table':
+        print(profiler.format_table())
 
 def main():
     try:
-        args = parse_arguments()
-        validate_files(args)
+        registry = load_registry()
+        args = parse_arguments(registry)
+        if args.clear_cache:
+            ParseCache(args.cache_dir).clear()
+            print(f"Cache {args.cache_dir} cleared")
+        
+        if args.batch:
+            run_batch_mode(args)
+            return
+        if args.watch and (args.incremental or args.summary or args.store or args.splitwise_members is not None):
+            raise ValueError("--watch cannot be combined with --incremental, --summary, --store or --splitwise-members")
         
-        splitwise_parser_name = 'splitwise'
-        paypal_parser_name = 'paypal'
-        satispay_parser_name = 'satispay'
-
-        file_mappings = {}
-        if not args.skip_splitwise: file_mappings[splitwise_parser_name] = args.splitwise
-        if not args.skip_paypal: file_mappings[paypal_parser_name] = args.paypal
-        if not args.skip_satispay: file_mappings[satispay_parser_name] = args.satispay
+        if args.inbox:
+            file_mappings = detect_files(args, registry)
+        else:
+            file_mappings = validate_files(requested_files(args, registry), registry)
         output_file = args.output
+        parsers = create_parsers(file_mappings, args, registry)
+        
+        executor = args.executor if args.jobs > 1 else None
+        cache = None if args.no_cache else ParseCache(args.cache_dir)
+        categorizer = Categorizer.from_file(args.categories) if args.categories else None
+        aggregates = MonthlyAggregates() if args.summary else None
+        formatter = TransactionFormatter(buffer_size=args.buffer_size, category_subtotals=categorizer is not None,
+                                         subtotals=args.subtotals, aggregates=aggregates)
+        deduplicator = TransactionDeduplicator(args.dedup_days) if args.dedup else None
+        profiler = Profiler() if args.profile else NULL_PROFILER
+        store = TransactionStore(args.store) if args.store else None
+        processor = TransactionProcessor(parsers, executor=executor, max_workers=args.jobs, cache=cache,
+                                         formatter=formatter, deduplicator=deduplicator, profiler=profiler,
+                                         store=store, categorizer=categorizer)
+        if args.watch:
+            run_watch_mode(args, registry, processor)
+            return
+        
+        if args.splitwise_members is not None:
+            if args.incremental or args.summary or args.store:
+                raise ValueError("--splitwise-members cannot be combined with --incremental, --summary or --store")
+            run = lambda: processor.process_members(file_mappings, output_file, args.splitwise_members or None)
+        else:
+            run = lambda: processor.process_files(file_mappings, output_file, incremental=args.incremental)
         
-        parsers = {
-            splitwise_parser_name: SplitwiseParser(args.splitwise_onwer),
-            paypal_parser_name: PaypalParser(),
-            satispay_parser_name: SatispayParser()
-        }
+        try:
+            run_profiled(args, run)
+        finally:
+            if store is not None:
+                store.close()
         
-        processor = TransactionProcessor(parsers)
-        processor.process_files(file_mappings, output_file)
+        if aggregates is not None:
+            aggregates.write_report(args.summary)
         
         print("Processing completed successfully!")
+        print_profile(args, profiler)
         
     except KeyboardInterrupt:
         print("\nOperation interrupted by user.")
@@ -1,20 +1,34 @@
+import hashlib
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+from typing import Optional
 
 class BackType(Enum):
     SPLITWISE = 1
     PAYPAL = 2
     SATISPAY = 3
 
-@dataclass
+def to_cents(value) -> int:
+    return int(round(float(value) * 100))
+
+def format_cents(cents: int) -> str:
+    cents = abs(cents)
+    return f"{cents // 100},{cents % 100:02d}€"
+
+@dataclass(slots=True)
 class Transaction:
     description: str
-    amount: float
+    amount_cents: int
     date: datetime
     source_type: BackType
     source_prefix: str 
-    raw_data: dict = None
+    raw_data: Optional[dict] = None
+    category: Optional[str] = None
+    
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
     
     @property
     def month_name(self) -> str:
@@ -25,8 +39,16 @@ class Transaction:
         }
         return month_map[self.date.month]
     
+    @property
+    def month_ordinal(self) -> int:
+        return self.date.year * 12 + self.date.month - 1
+    
+    def fingerprint(self) -> str:
+        key = f"{self.source_prefix}|{self.date.isoformat()}|{self.description}|{self.amount_cents}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+    
     def format_amount(self) -> str:
-        return f"{abs(self.amount):.2f}€".replace(".", ",")
+        return format_cents(self.amount_cents)
     
     def to_csv_row(self) -> list:
-        return [f"{self.source_prefix} {self.description}", "", self.format_amount(), self.month_name]
\ No newline at end of file
+        return [f"{self.source_prefix} {self.description}", self.category or "", self.format_amount(), self.month_name]
\ No newline at end of file
@@ -0,0 +1,93 @@
+import heapq
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from models import Transaction
+
+MIN_CHUNK_BYTES = 4 * 1024 * 1024
+QUOTE_WINDOW = 16 * 1024 * 1024
+
+def _count_quotes(buffer, start: int, end: int) -> int:
+    count = 0
+    for offset in range(start, end, QUOTE_WINDOW):
+        count += buffer[offset:min(offset + QUOTE_WINDOW, end)].count(b'"')
+    return count
+
+def _record_end(buffer, start: int, target: int) -> int:
+    """Offset just past the first newline at or after ``target`` that is outside quotes.
+
+    ``start`` must be the beginning of a record; quotes are counted from there,
+    and an escaped quote (``""``) counts twice, so an odd count means the
+    newline belongs to a quoted field.
+    """
+    quotes = _count_quotes(buffer, start, target)
+    position = target
+    while True:
+        newline = buffer.find(b"\n", position)
+        if newline == -1:
+            return len(buffer)
+        quotes += _count_quotes(buffer, position, newline)
+        if quotes % 2 == 0:
+            return newline + 1
+        position = newline + 1
+
+def split_chunks(buffer, chunks: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """End of the header line and ``(start, end)`` of at most ``chunks`` byte ranges of whole records."""
+    header_end = _record_end(buffer, 0, 0)
+    size = len(buffer) - header_end
+    
+    ranges = []
+    start = header_end
+    for index in range(1, chunks):
+        target = max(start, header_end + size * index // chunks)
+        end = _record_end(buffer, start, target)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    if len(buffer) > start:
+        ranges.append((start, len(buffer)))
+    return header_end, ranges
+
+def parse_chunk(parser, filepath: str, header_end: int, start: int, end: int,
+                since: Optional[datetime] = None) -> List[tuple]:
+    """Parse the records in ``[start, end)`` of ``filepath`` as if they followed the header.
+
+    The transactions come back sorted by date as plain field tuples, which
+    pickle back to the parent several times faster than the dataclass.
+    """
+    with open(filepath, mode="rb") as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        data = buffer[:header_end] + buffer[start:end]
+    
+    with io.TextIOWrapper(io.BytesIO(data), encoding=parser.ENCODING) as stream:
+        transactions = sorted(parser._iter_stream_transactions(stream, since), key=lambda x: x.date)
+    return [(t.description, t.amount_cents, t.date, t.source_type, t.source_prefix, t.raw_data) for t in transactions]
+
+def parse_chunked(parser, filepath: str, workers: int, min_chunk_bytes: int = MIN_CHUNK_BYTES,
+                  since: Optional[datetime] = None) -> Iterator[Transaction]:
+    """Parse a CSV export on ``workers`` processes, yielding the same transactions as the serial parser.
+
+    The file is memory-mapped and cut at newlines outside quoted fields. Every
+    chunk is parsed, filtered and sorted by date in the pool, then the sorted
+    chunks are merged; ``heapq.merge`` keeps chunk order for equal dates, like
+    the stable sort of the serial path.
+    """
+    size = os.path.getsize(filepath)
+    chunks = min(workers, size // min_chunk_bytes)
+    if chunks < 2:
+        with open(filepath, mode="r", encoding=parser.ENCODING) as infile:
+            yield from sorted(parser._iter_stream_transactions(infile, since), key=lambda x: x.date)
+        return
+    
+    with open(filepath, mode="rb") as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        header_end, ranges = split_chunks(buffer, chunks)
+    
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(parse_chunk, parser, filepath, header_end, start, end, since) for start, end in ranges]
+        results = [future.result() for future in futures]
+    
+    for fields in heapq.merge(*results, key=itemgetter(2)):
+        yield Transaction(*fields)
@@ -0,0 +1,118 @@
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from fileio import atomic_write
+from parser.registry import ParserRegistry
+
+SHEET_NAME_PATTERN = re.compile(rb'<sheet\b[^>]*\bname="([^"]*)"')
+XLSX_MAGIC = b"PK\x03\x04"
+
+class SourceDetector:
+    """Routes a file to a registered parser by sniffing its header.
+
+    CSV files are matched on the column names of their first line and xlsx
+    files on the sheet names listed in ``xl/workbook.xml``; neither loads the
+    whole file. Results are cached per path, size and modification time, in
+    memory and in ``cache_path`` when given, so a cache hit reads nothing.
+    """
+    
+    SNIFF_BYTES = 8192
+    
+    def __init__(self, registry: ParserRegistry, cache_path: Optional[str] = None):
+        self.registry = registry
+        self.cache_path = cache_path
+        self.results: Dict[str, list] = self._load_cache()
+        self._dirty = False
+        signatures = sorted((spec.name, spec.csv_columns, spec.xlsx_sheet) for spec in registry)
+        self._registry_key = hashlib.sha1(repr(signatures).encode("utf-8")).hexdigest()[:12]
+    
+    def detect(self, path: str) -> Optional[str]:
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        signature = f"{stat.st_size}:{stat.st_mtime_ns}:{self._registry_key}"
+        cached = self.results.get(key)
+        if cached is None or cached[0] != signature:
+            cached = self.results[key] = [signature, self._sniff(path)]
+            self._dirty = True
+        return cached[1]
+    
+    def route(self, paths: Iterable[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """Map every path to its parser name, in registry order; also return the unrecognized paths."""
+        file_mappings, unknown = {}, []
+        for path in paths:
+            name = self.detect(path)
+            if name is None:
+                unknown.append(path)
+            else:
+                file_mappings.setdefault(name, []).append(path)
+        
+        self.save()
+        ordered = {spec.name: file_mappings[spec.name] for spec in self.registry if spec.name in file_mappings}
+        return ordered, unknown
+    
+    def save(self):
+        if not self.cache_path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with atomic_write(self.cache_path) as outfile:
+            outfile.write(json.dumps(self.results).encode("utf-8"))
+        self._dirty = False
+    
+    def _sniff(self, path: str) -> Optional[str]:
+        with open(path, mode="rb") as infile:
+            head = infile.read(self.SNIFF_BYTES)
+        
+        if head.startswith(XLSX_MAGIC):
+            return self._match_xlsx(path)
+        return self._match_csv(head)
+    
+    def _match_csv(self, head: bytes) -> Optional[str]:
+        first_line = head.decode("utf-8-sig", errors="replace").splitlines()[:1]
+        if not first_line:
+            return None
+        
+        columns = {column.strip() for column in next(csv.reader(first_line))}
+        for spec in self.registry:
+            if spec.csv_columns and columns.issuperset(spec.csv_columns):
+                return spec.name
+        return None
+    
+    def _match_xlsx(self, path: str) -> Optional[str]:
+        try:
+            with zipfile.ZipFile(path) as archive:
+                workbook = archive.read("xl/workbook.xml")
+        except (zipfile.BadZipFile, KeyError):
+            return None
+        
+        sheets = {name.decode("utf-8") for name in SHEET_NAME_PATTERN.findall(workbook)}
+        for spec in self.registry:
+            if spec.xlsx_sheet and spec.xlsx_sheet in sheets:
+                return spec.name
+        return None
+    
+    def _load_cache(self) -> Dict[str, list]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, mode="r", encoding="utf-8") as infile:
+                results = json.load(infile)
+        except ValueError:
+            return {}
+        return {path: entry for path, entry in results.items() if isinstance(entry, list) and len(entry) == 2}
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    """Files of the given directories, glob patterns and plain paths, sorted and unique."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.update(str(path) for path in Path(pattern).iterdir()
+                         if path.is_file() and not path.name.startswith("."))
+        else:
+            files.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(files)
@@ -1,13 +1,67 @@
 import csv
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from instrumentation import NULL_PROFILER
 from models import Transaction, BackType
+from transaction_batch import TransactionBatch
+
+_reported_errors: ContextVar[Optional[List[str]]] = ContextVar("reported_errors", default=None)
+
+class ParseError(ValueError):
+    """The errors parsers reported for one call, raised when a failed file must not pass for an empty one."""
+    
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+@contextmanager
+def collect_errors() -> Iterator[List[str]]:
+    """Collect the errors parsers report in this thread or task until the block exits."""
+    errors = []
+    token = _reported_errors.set(errors)
+    try:
+        yield errors
+    finally:
+        _reported_errors.reset(token)
+
+def record_errors(messages: List[str]):
+    """Add errors, e.g. reported on a worker, to the enclosing ``collect_errors`` without printing them."""
+    errors = _reported_errors.get()
+    if errors is not None:
+        errors.extend(messages)
 
 class TransactionParser(ABC):
     
+    keep_raw = False
+    profiler = NULL_PROFILER
+    
+    @property
+    def profile_name(self) -> str:
+        """Prefix of this parser's stages and counters in the profiler report."""
+        return type(self).__name__.replace("Parser", "").lower()
+    
+    def parse_file(self, filepath: str, since: Optional[datetime] = None) -> List[Transaction]:
+        """``filepath`` may also be the bytes or a binary file object of an uploaded export."""
+        return list(self.iter_transactions(filepath, since))
+    
+    def parse_file_with_errors(self, filepath: str, since: Optional[datetime] = None) -> Tuple[List[Transaction], List[str]]:
+        """``parse_file`` and the errors it reported, for a parse on a worker thread or process."""
+        with collect_errors() as errors:
+            return self.parse_file(filepath, since), errors
+    
+    def parse_batch(self, filepath: str) -> TransactionBatch:
+        """Columnar variant of ``parse_file``, sorted by date."""
+        return TransactionBatch.from_transactions(self.iter_transactions(filepath))
+    
     @abstractmethod
-    def parse_file(self, filepath: str) -> List[Transaction]:
+    def iter_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        """Yield the included transactions of ``filepath`` sorted by date.
+
+        With ``since``, rows dated before it are skipped before a transaction is built for them.
+        """
         pass
     
     @abstractmethod
@@ -17,4 +71,12 @@ class TransactionParser(ABC):
     @abstractmethod
     def get_source_prefix(self) -> str:
         pass
-
+    
+    def report_error(self, message: str):
+        """Print a parse error and add it to the enclosing ``collect_errors``, so a failed file can be told from an empty one."""
+        print(message)
+        record_errors([message])
+    
+    def get_cache_config(self) -> dict:
+        """Settings that change the parse result, part of the parse cache key."""
+        return {'keep_raw': self.keep_raw}
@@ -1,40 +1,195 @@
 import csv
+from contextlib import ExitStack
 from datetime import datetime
-from typing import List
-from models import Transaction, BackType
+from functools import lru_cache
+from itertools import compress
+from operator import itemgetter
+from typing import Iterator, List, Optional, Tuple
+from models import Transaction, BackType, to_cents
 from parser.parser import TransactionParser
+from parser.chunked import parse_chunked
+from fileio import is_path, open_source_text
+from transaction_batch import TransactionBatch, cents_column, numpy_module
+
+@lru_cache(maxsize=8192)
+def parse_paypal_date(value: str) -> datetime:
+    """Parse ``%d/%m/%Y`` dates; exports repeat the same few days on many rows."""
+    day, month, year = value.split("/")
+    return datetime(int(year), int(month), int(day))
 
 class PaypalParser(TransactionParser):
     
+    COLUMNS = ("Data", "Nome", "Descrizione", "Lordo")
+    ENCODING = "utf-8-sig"
+    
+    def __init__(self, keep_raw: bool = False, workers: int = 1):
+        self.keep_raw = keep_raw
+        self.workers = int(workers)
+    
     def get_source_prefix(self) -> str:
         return "(Paypal)"
     
-    def parse_file(self, filepath: str) -> List[Transaction]:
-        transactions = []
-        
+    def iter_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
         try:
-            with open(filepath, mode="r", encoding="utf-8-sig") as infile:
-                reader = csv.DictReader(infile, 
-                                      delimiter=',', 
-                                      quotechar='"',
-                                      skipinitialspace=True)
-                rows = list(reader)
+            with self.profiler.stage(f"{self.profile_name}.parse"):
+                if self.workers > 1 and is_path(filepath):
+                    transactions = list(parse_chunked(self, filepath, self.workers, since=since))
+                else:
+                    transactions = sorted(self._iter_file_transactions(filepath, since), key=lambda x: x.date)
             
-            for row in rows:
-                if self.should_include_transaction(row):
-                    transaction = self._create_transaction_from_row(row)
-                    transactions.append(transaction)
+        except FileNotFoundError:
+            self.report_error(f"File PayPal {filepath} don't found. Skipped PayPal transaction.")
+            return
+        except Exception as e:
+            self.report_error(f"Error parsing PayPal file: {e}")
+            return
             
-            transactions.sort(key=lambda x: x.date)
+        yield from transactions
+    
+    def _iter_file_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        with ExitStack() as stack:
+            with self.profiler.stage(f"{self.profile_name}.open"):
+                infile = stack.enter_context(open_source_text(filepath, self.ENCODING))
+            yield from self._iter_stream_transactions(infile, since)
+    
+    def _iter_stream_transactions(self, infile, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        if self.profiler.enabled:
+            yield from self._iter_profiled_transactions(infile, since)
+            return
+        
+        reader = self._reader(infile)
+        header = next(reader, [])
+        (date_index, name_index, description_index, lordo_index), width = self._resolve_columns(header)
+        source_prefix = self.get_source_prefix()
+        
+        for row in reader:
+            if len(row) < width:
+                continue
+            
+            amount = self._parse_amount(row[lordo_index])
+            if amount is None or amount >= 0:
+                continue
+            
+            date = parse_paypal_date(row[date_index])
+            if since is not None and date < since:
+                continue
+            
+            name = row[name_index].strip()
+            yield Transaction(
+                description=name if name else row[description_index],
+                amount_cents=abs(to_cents(amount)),
+                date=date,
+                source_type=BackType.PAYPAL,
+                source_prefix=source_prefix,
+                raw_data=dict(zip(header, row)) if self.keep_raw else None
+            )
+    
+    def _iter_profiled_transactions(self, infile, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        """``_iter_stream_transactions`` timing the decode, filter and build of every row."""
+        clock = self.profiler.clock
+        stats = self.profiler.row_stats()
+        
+        reader = self._reader(infile)
+        header = next(reader, [])
+        (date_index, name_index, description_index, lordo_index), width = self._resolve_columns(header)
+        source_prefix = self.get_source_prefix()
+        
+        try:
+            started = clock()
+            for row in reader:
+                decoded = clock()
+                stats.decode += decoded - started
+                stats.rows_in += 1
+                
+                amount = self._parse_amount(row[lordo_index]) if len(row) >= width else None
+                date = parse_paypal_date(row[date_index]) if amount is not None and amount < 0 else None
+                include = date is not None and (since is None or date >= since)
+                started = clock()
+                stats.filter += started - decoded
+                if not include:
+                    stats.filtered += 1
+                    continue
+                
+                name = row[name_index].strip()
+                transaction = Transaction(
+                    description=name if name else row[description_index],
+                    amount_cents=abs(to_cents(amount)),
+                    date=date,
+                    source_type=BackType.PAYPAL,
+                    source_prefix=source_prefix,
+                    raw_data=dict(zip(header, row)) if self.keep_raw else None
+                )
+                stats.build += clock() - started
+                yield transaction
+                started = clock()
+        finally:
+            self.profiler.record_rows(self.profile_name, stats)
+    
+    def parse_batch(self, filepath: str) -> TransactionBatch:
+        try:
+            batch = self._read_batch(filepath).sorted_by_date()
             
         except FileNotFoundError:
-            print(f"File PayPal {filepath} don't found. Skipped PayPal transaction.")
-            return []
+            self.report_error(f"File PayPal {filepath} don't found. Skipped PayPal transaction.")
+            return TransactionBatch()
         except Exception as e:
-            print(f"Error parsing PayPal file: {e}")
-            return []
+            self.report_error(f"Error parsing PayPal file: {e}")
+            return TransactionBatch()
             
-        return transactions
+        return batch
+    
+    def _read_batch(self, filepath: str) -> TransactionBatch:
+        with open_source_text(filepath, self.ENCODING) as infile:
+            reader = self._reader(infile)
+            indexes, width = self._resolve_columns(next(reader, []))
+            pick = itemgetter(*indexes)
+            columns = list(zip(*[pick(row) for row in reader if len(row) >= width])) or [(), (), (), ()]
+        
+        dates, names, descriptions, lordi = columns
+        cents = list(map(self._parse_cents, lordi))
+        numpy = numpy_module()
+        if numpy is None:
+            mask = [value is not None and value < 0 for value in cents]
+            amount_cents = [-value for value in compress(cents, mask)]
+        else:
+            # Unparsed amounts read as 0, which ``amounts < 0`` already drops
+            amounts, _ = cents_column(cents)
+            mask = amounts < 0
+            amount_cents = -amounts[mask]
+            mask = mask.tolist()
+        
+        return TransactionBatch.from_columns(
+            BackType.PAYPAL,
+            self.get_source_prefix(),
+            descriptions=[name.strip() or description
+                          for name, description in compress(zip(names, descriptions), mask)],
+            amount_cents=amount_cents,
+            dates=[parse_paypal_date(value) for value in compress(dates, mask)]
+        )
+    
+    def _reader(self, infile):
+        return csv.reader(infile, 
+                          delimiter=',', 
+                          quotechar='"',
+                          skipinitialspace=True)
+    
+    def _resolve_columns(self, header: List[str]) -> Tuple[List[int], int]:
+        """Index of every column in ``COLUMNS`` (``Lordo`` may carry a trailing space) and the minimum row width."""
+        names = [("Lordo " if name == "Lordo" and "Lordo " in header else name) for name in self.COLUMNS]
+        indexes = [header.index(name) for name in names]
+        return indexes, max(indexes) + 1
+    
+    @staticmethod
+    def _parse_amount(value: str) -> Optional[float]:
+        try:
+            return float(value.replace(",", "."))
+        except ValueError:
+            return None
+    
+    @classmethod
+    def _parse_cents(cls, value: str) -> Optional[int]:
+        amount = cls._parse_amount(value)
+        return None if amount is None else to_cents(amount)
     
     def should_include_transaction(self, raw_data: dict) -> bool:
         try:
@@ -43,18 +198,3 @@ class PaypalParser(TransactionParser):
             return lordo < 0
         except (ValueError, KeyError, AttributeError):
             return False
-    
-    def _create_transaction_from_row(self, row: dict) -> Transaction:
-        description = row["Nome"].strip() if row["Nome"].strip() else row["Descrizione"]
-        lordo_field = row.get("Lordo ", row.get("Lordo", "0"))
-        amount = abs(float(lordo_field.replace(",", ".")))
-        date = datetime.strptime(row["Data"], "%d/%m/%Y")
-        
-        return Transaction(
-            description=description,
-            amount=amount,
-            date=date,
-            source_type=BackType.PAYPAL,
-            source_prefix=self.get_source_prefix(),
-            raw_data=row
-        )
\ No newline at end of file
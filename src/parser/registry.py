@@ -0,0 +1,83 @@
+import importlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from parser.parser import TransactionParser
+
+@dataclass(frozen=True)
+class ParserOption:
+    """Extra command line option passed to the parser constructor as ``argument``."""
+    flag: str
+    argument: str
+    default: Any = None
+    help: str = ""
+
+@dataclass(frozen=True)
+class ParserSpec:
+    name: str
+    label: str
+    target: str
+    default_file: Optional[str] = None
+    options: Tuple[ParserOption, ...] = ()
+    csv_columns: Tuple[str, ...] = ()
+    xlsx_sheet: Optional[str] = None
+    
+    def load(self) -> type:
+        """Import the parser class named by ``target`` (``module:Class``)."""
+        module_name, _, class_name = self.target.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)
+    
+    def create(self, **kwargs) -> TransactionParser:
+        return self.load()(**kwargs)
+
+BUILTIN_PARSERS = (
+    ParserSpec("splitwise", "Splitwise", "parser.splitwise_parser:SplitwiseParser",
+               options=(ParserOption("--splitwise-onwer", "name_onwer", "christian rocchetti", "Splitwise onwe"),
+                        ParserOption("--splitwise-workers", "workers", 1,
+                                     "Processes parsing chunks of a large Splitwise export")),
+               csv_columns=("Data", "Descrizione", "Costo")),
+    ParserSpec("paypal", "PayPal", "parser.paypal_parser:PaypalParser",
+               options=(ParserOption("--paypal-workers", "workers", 1,
+                                     "Processes parsing chunks of a large PayPal export"),),
+               csv_columns=("Data", "Lordo", "Nome")),
+    ParserSpec("satispay", "Satispay", "parser.satispay_parser:SatispayParser",
+               xlsx_sheet="Transactions")
+)
+
+class ParserRegistry:
+    """Parser specs by name; the parser modules are only imported by ``create``."""
+    
+    def __init__(self, specs: Tuple[ParserSpec, ...] = BUILTIN_PARSERS):
+        self.specs: Dict[str, ParserSpec] = {}
+        for spec in specs:
+            self.register(spec)
+    
+    def register(self, spec: ParserSpec):
+        self.specs[spec.name] = spec
+    
+    def load_config(self, path: str):
+        """Register the parsers listed in a JSON file.
+
+        Each entry has ``name``, ``label``, ``target`` and optionally
+        ``default_file``, ``options`` (``flag``, ``argument``, ``default``, ``help``)
+        and the ``csv_columns`` / ``xlsx_sheet`` used to detect its files.
+        """
+        with open(path, mode="r", encoding="utf-8") as infile:
+            entries = json.load(infile)
+        
+        for entry in entries:
+            options = tuple(ParserOption(**option) for option in entry.pop("options", []))
+            csv_columns = tuple(entry.pop("csv_columns", ()))
+            self.register(ParserSpec(options=options, csv_columns=csv_columns, **entry))
+    
+    def names(self) -> List[str]:
+        return list(self.specs)
+    
+    def __iter__(self):
+        return iter(self.specs.values())
+    
+    def __getitem__(self, name: str) -> ParserSpec:
+        return self.specs[name]
+    
+    def create(self, name: str, **kwargs) -> TransactionParser:
+        return self.specs[name].create(**kwargs)
@@ -1,51 +1,99 @@
 import openpyxl
 from datetime import datetime
-from typing import List
-from models import Transaction, BackType
+from typing import Iterator, Optional
+from models import Transaction, BackType, to_cents
 from parser.parser import TransactionParser
+from fileio import open_source_binary, source_name
 
 class SatispayParser(TransactionParser):
     
+    SHEET_NAME = "Transactions"
+    
+    def __init__(self, keep_raw: bool = False):
+        self.keep_raw = keep_raw
+    
     def get_source_prefix(self) -> str:
         return "(Satispay)"
     
-    def parse_file(self, filepath: str) -> List[Transaction]:
-        transactions = []
-        
+    def iter_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
         try:
-            workbook = openpyxl.load_workbook(filepath)
+            with self.profiler.stage(f"{self.profile_name}.parse"):
+                transactions = sorted(self._iter_file_transactions(filepath, since), key=lambda x: x.date)
             
-            if "Transactions" not in workbook.sheetnames:
-                print(f"Sheet 'Transactions' not found in file {filepath}. Skipping Satispay transactions.")
-                return []
+        except FileNotFoundError:
+            self.report_error(f"Satispay file {filepath} not found. Skipping Satispay transactions.")
+            return
+        except Exception as e:
+            self.report_error(f"Error parsing Satispay file: {e}")
+            return
             
-            worksheet = workbook["Transactions"]
+        yield from transactions
+    
+    def _iter_file_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        with open_source_binary(filepath) as source:
+            yield from self._iter_workbook_transactions(source, source_name(filepath), since)
+    
+    def _iter_workbook_transactions(self, source, name: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        with self.profiler.stage(f"{self.profile_name}.open"):
+            workbook = openpyxl.load_workbook(source, read_only=True)
+        
+        try:
+            if self.SHEET_NAME not in workbook.sheetnames:
+                self.report_error(f"Sheet '{self.SHEET_NAME}' not found in file {name}. Skipping Satispay transactions.")
+                return
             
-            headers = []
-            for cell in worksheet[1]:
-                headers.append(cell.value)
+            worksheet = workbook[self.SHEET_NAME]
+            # Read-only mode stops at the stored dimension, which some writers get wrong
+            worksheet.reset_dimensions()
+            rows = worksheet.iter_rows(values_only=True)
+            headers = next(rows, None)
+            if headers is None:
+                return
             
-            rows = []
-            for row in worksheet.iter_rows(min_row=2, values_only=True):
-                if any(cell is not None for cell in row):
-                    row_dict = dict(zip(headers, row))
-                    rows.append(row_dict)
+            if self.profiler.enabled:
+                yield from self._iter_profiled_rows(rows, headers, since)
+                return
             
             for row in rows:
-                if self.should_include_transaction(row):
-                    transaction = self._create_transaction_from_row(row)
-                    transactions.append(transaction)
-            
-            transactions.sort(key=lambda x: x.date)
-            
-        except FileNotFoundError:
-            print(f"Satispay file {filepath} not found. Skipping Satispay transactions.")
-            return []
-        except Exception as e:
-            print(f"Error parsing Satispay file: {e}")
-            return []
-            
-        return transactions
+                if not any(cell is not None for cell in row):
+                    continue
+                
+                row_dict = dict(zip(headers, row))
+                if self.should_include_transaction(row_dict) and (since is None or self._parse_date(row_dict) >= since):
+                    yield self._create_transaction_from_row(row_dict)
+        finally:
+            workbook.close()
+    
+    def _iter_profiled_rows(self, rows, headers, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        """The transactions of ``rows``, timing the decode, filter and build of every row."""
+        clock = self.profiler.clock
+        stats = self.profiler.row_stats()
+        
+        try:
+            started = clock()
+            for row in rows:
+                if not any(cell is not None for cell in row):
+                    started = clock()
+                    continue
+                
+                row_dict = dict(zip(headers, row))
+                decoded = clock()
+                stats.decode += decoded - started
+                stats.rows_in += 1
+                
+                include = self.should_include_transaction(row_dict) and (since is None or self._parse_date(row_dict) >= since)
+                started = clock()
+                stats.filter += started - decoded
+                if not include:
+                    stats.filtered += 1
+                    continue
+                
+                transaction = self._create_transaction_from_row(row_dict)
+                stats.build += clock() - started
+                yield transaction
+                started = clock()
+        finally:
+            self.profiler.record_rows(self.profile_name, stats)
     
     def should_include_transaction(self, raw_data: dict) -> bool:
         try:
@@ -59,20 +107,21 @@ class SatispayParser(TransactionParser):
         description = row.get("Name", "").strip()
         
         amount_cell = row.get("Amount", 0.00)
-        amount = abs(float(amount_cell))
-        
-        date_str = row.get("Date", "")
-        if isinstance(date_str, str):
-            date_only = date_str.split(" ")[0]
-            date = datetime.strptime(date_only, "%d/%m/%Y")
-        else:
-            date = date_str if isinstance(date_str, datetime) else datetime.now()
+        amount_cents = abs(to_cents(amount_cell))
         
         return Transaction(
             description=description,
-            amount=amount,
-            date=date,
+            amount_cents=amount_cents,
+            date=self._parse_date(row),
             source_type=BackType.SATISPAY,
             source_prefix=self.get_source_prefix(),
-            raw_data=row
-        )
\ No newline at end of file
+            raw_data=row if self.keep_raw else None
+        )
+    
+    @staticmethod
+    def _parse_date(row: dict) -> datetime:
+        date_str = row.get("Date", "")
+        if isinstance(date_str, str):
+            date_only = date_str.split(" ")[0]
+            return datetime.strptime(date_only, "%d/%m/%Y")
+        return date_str if isinstance(date_str, datetime) else datetime.now()
@@ -1,41 +1,207 @@
 import csv
+from contextlib import ExitStack
 from datetime import datetime
-from typing import List
-from models import Transaction, BackType
+from itertools import compress
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional
+from models import Transaction, BackType, to_cents
 from parser.parser import TransactionParser
+from parser.chunked import parse_chunked
+from fileio import is_path, open_source_text
+from transaction_batch import TransactionBatch, cents_column, numpy_module
 
 class SplitwiseParser(TransactionParser):
-    def __init__(self, name_onwer = "christian rocchetti"):
+    
+    ENCODING = "utf-8"
+    BASE_COLUMNS = ("Data", "Descrizione", "Categorie", "Costo", "Valuta")
+    
+    def __init__(self, name_onwer = "christian rocchetti", keep_raw: bool = False, workers: int = 1):
         self.name_onwer = name_onwer
+        self.keep_raw = keep_raw
+        self.workers = int(workers)
 
 
     def get_source_prefix(self) -> str:
         return "(Split)"
     
-    def parse_file(self, filepath: str) -> List[Transaction]:
-        transactions = []
-        
+    def get_cache_config(self) -> dict:
+        return {**super().get_cache_config(), 'name_onwer': self.name_onwer}
+    
+    def iter_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
         try:
-            with open(filepath, mode="r", encoding="utf-8") as infile:
-                reader = csv.DictReader(infile)
-                rows = list(reader)
+            with self.profiler.stage(f"{self.profile_name}.parse"):
+                if self.workers > 1 and is_path(filepath):
+                    transactions = list(parse_chunked(self, filepath, self.workers, since=since))
+                else:
+                    transactions = sorted(self._iter_file_transactions(filepath, since), key=lambda x: x.date)
+                    
+        except FileNotFoundError:
+            self.report_error(f"File Splitwise {filepath} don't found. Skipped Splitwise transaction.")
+            return
+        except Exception as e:
+            self.report_error(f"Errore parsing Splitwise file: {e}")
+            return
             
-            rows.sort(key=lambda x: x["Data"])
+        yield from transactions
+    
+    def _iter_file_transactions(self, filepath: str, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        with ExitStack() as stack:
+            with self.profiler.stage(f"{self.profile_name}.open"):
+                infile = stack.enter_context(open_source_text(filepath, self.ENCODING))
+            yield from self._iter_stream_transactions(infile, since)
+    
+    def _iter_stream_transactions(self, infile, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        reader = csv.DictReader(infile)
+        if reader.fieldnames is not None:
+            self._check_owner(reader.fieldnames)
+        if self.profiler.enabled:
+            yield from self._iter_profiled_transactions(reader, since)
+            return
+        
+        since_day = self._since_day(since)
+        for row in reader:
+            if row.get("Data", "") >= since_day and self.should_include_transaction(row):
+                yield self.__create_transaction_from_row(row)
+    
+    def _iter_profiled_transactions(self, reader: csv.DictReader, since: Optional[datetime] = None) -> Iterator[Transaction]:
+        """``_iter_stream_transactions`` timing the decode, filter and build of every row."""
+        clock = self.profiler.clock
+        stats = self.profiler.row_stats()
+        since_day = self._since_day(since)
+        
+        try:
+            started = clock()
+            for row in reader:
+                decoded = clock()
+                stats.decode += decoded - started
+                stats.rows_in += 1
+                
+                include = row.get("Data", "") >= since_day and self.should_include_transaction(row)
+                started = clock()
+                stats.filter += started - decoded
+                if not include:
+                    stats.filtered += 1
+                    continue
+                
+                transaction = self.__create_transaction_from_row(row)
+                stats.build += clock() - started
+                yield transaction
+                started = clock()
+        finally:
+            self.profiler.record_rows(self.profile_name, stats)
+    
+    def _check_owner(self, header: List[str]):
+        """Reject an export without a column for the owner, whose rows would all be dropped."""
+        if self.name_onwer not in header:
+            raise ValueError(f"'{self.name_onwer}' is not a member of the export, expected one of "
+                             f"{[name for name in header if name not in self.BASE_COLUMNS]}")
+    
+    @staticmethod
+    def _since_day(since: Optional[datetime]) -> str:
+        """``since`` as an ISO day, which compares as text with the ``Data`` column.
+
+        A row on that day is kept and left to the caller, whatever the time of ``since``.
+        """
+        return since.strftime("%Y-%m-%d") if since is not None else ""
+    
+    def parse_batch(self, filepath: str) -> TransactionBatch:
+        try:
+            batch = self._read_batch(filepath).sorted_by_date()
             
-            for row in rows:
-                if self.should_include_transaction(row):
-                    transaction = self.__create_transaction_from_row(row)
-                    transactions.append(transaction)
-                    
         except FileNotFoundError:
-            print(f"File Splitwise {filepath} don't found. Skipped Splitwise transaction.")
-            return []
+            self.report_error(f"File Splitwise {filepath} don't found. Skipped Splitwise transaction.")
+            return TransactionBatch()
         except Exception as e:
-            print(f"Errore parsing Splitwise file: {e}")
-            return []
+            self.report_error(f"Errore parsing Splitwise file: {e}")
+            return TransactionBatch()
+            
+        return batch
+    
+    def _read_batch(self, filepath: str) -> TransactionBatch:
+        with open_source_text(filepath, self.ENCODING) as infile:
+            reader = csv.reader(infile)
+            header = next(reader, [])
+            self._check_owner(header)
+            indexes = [header.index(name) for name in ("Data", "Descrizione", "Costo", self.name_onwer)]
+            width = max(indexes) + 1
+            pick = itemgetter(*indexes)
+            columns = list(zip(*[pick(row) for row in reader if len(row) >= width])) or [(), (), (), ()]
+        
+        dates, descriptions, totals, owner_shares = columns
+        total_cents = [self._parse_cents(total) for total in totals]
+        owner_cents = [self._parse_cents(share) for share in owner_shares]
+        numpy = numpy_module()
+        if numpy is None:
+            mask = [total is not None and share is not None and not (share > 0 and share == total)
+                    for total, share in zip(total_cents, owner_cents)]
+            amount_cents = [abs(share) for share in compress(owner_cents, mask)]
+        else:
+            totals, has_total = cents_column(total_cents)
+            shares, has_share = cents_column(owner_cents)
+            mask = has_total & has_share & ~((shares > 0) & (shares == totals))
+            amount_cents = numpy.abs(shares[mask])
+            mask = mask.tolist()
+        
+        return TransactionBatch.from_columns(
+            BackType.SPLITWISE,
+            self.get_source_prefix(),
+            descriptions=list(compress(descriptions, mask)),
+            amount_cents=amount_cents,
+            dates=[datetime.strptime(value, "%Y-%m-%d") for value in compress(dates, mask)]
+        )
+    
+    def parse_members(self, filepath: str, members: Optional[List[str]] = None) -> Dict[str, List[Transaction]]:
+        """The transactions of every member, as ``SplitwiseParser(member).parse_file`` would return them.
+
+        The export is read, and every date and cost converted, once for all the
+        members; ``members`` defaults to every column after the base ones.
+        """
+        try:
+            with self.profiler.stage(f"{self.profile_name}.parse"):
+                return self._read_members(filepath, members)
             
+        except FileNotFoundError:
+            self.report_error(f"File Splitwise {filepath} don't found. Skipped Splitwise transaction.")
+        except Exception as e:
+            self.report_error(f"Errore parsing Splitwise file: {e}")
+        return {}
+    
+    def _read_members(self, filepath: str, members: Optional[List[str]]) -> Dict[str, List[Transaction]]:
+        with open_source_text(filepath, self.ENCODING) as infile:
+            reader = csv.reader(infile)
+            header = next(reader, [])
+            if members is None:
+                members = [name for name in header if name not in self.BASE_COLUMNS]
+            date_index, description_index, total_index = (header.index(name) for name in ("Data", "Descrizione", "Costo"))
+            member_indexes = [header.index(member) for member in members]
+            rows = list(reader)
+        
+        records = []
+        for row in rows:
+            total = self._parse_cents(row[total_index]) if len(row) > total_index else None
+            shares = [self._parse_cents(row[i]) if len(row) > i else None for i in member_indexes]
+            included = [total is not None and share is not None and not (share > 0 and share == total) for share in shares]
+            if any(included):
+                records.append((datetime.strptime(row[date_index], "%Y-%m-%d"), row, shares, included))
+        records.sort(key=lambda record: record[0])
+        
+        prefix = self.get_source_prefix()
+        transactions = {}
+        for position, member in enumerate(members):
+            transactions[member] = [
+                Transaction(description=row[description_index], amount_cents=abs(shares[position]), date=date,
+                            source_type=BackType.SPLITWISE, source_prefix=prefix,
+                            raw_data=dict(zip(header, row)) if self.keep_raw else None)
+                for date, row, shares, included in records if included[position]]
         return transactions
     
+    @staticmethod
+    def _parse_cents(value: str) -> Optional[int]:
+        try:
+            return to_cents(value)
+        except ValueError:
+            return None
+    
     def should_include_transaction(self, raw_data: dict) -> bool:
         try:            
             return self.__not_include_if_christian_all_paid(raw_data)
@@ -51,14 +217,14 @@ class SplitwiseParser(TransactionParser):
     
     def __create_transaction_from_row(self, row: dict) -> Transaction:
         description = row["Descrizione"]
-        amount = abs(float(row[self.name_onwer]))
+        amount_cents = abs(to_cents(row[self.name_onwer]))
         date = datetime.strptime(row["Data"], "%Y-%m-%d")
         
         return Transaction(
             description=description,
-            amount=amount,
+            amount_cents=amount_cents,
             date=date,
             source_type=BackType.SPLITWISE,
             source_prefix=self.get_source_prefix(),
-            raw_data=row
+            raw_data=row if self.keep_raw else None
         )
\ No newline at end of file
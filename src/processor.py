@@ -1,32 +1,403 @@
-from typing import List, Dict, Optional
+import heapq
+import os
+import re
+import weakref
+from itertools import chain, repeat
+from operator import itemgetter
+import concurrent.futures
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 from models import Transaction
-from parser.parser import TransactionParser
+from parser.parser import ParseError, TransactionParser, record_errors
 from formatter import TransactionFormatter
+from aggregates import MonthlyAggregates
+from cache import ParseCache
+from incremental import IncrementalState
+from transaction_batch import TransactionBatch
+from dedup import TransactionDeduplicator
+from instrumentation import NULL_PROFILER, Profiler
+from store import TransactionStore
+from categories import Categorizer
+from fileio import Source, is_path
 
 class TransactionProcessor:
-    def __init__(self, parsers: Dict[str, TransactionParser] = None):
+    EXECUTORS = {
+        'thread': 'ThreadPoolExecutor',
+        'process': 'ProcessPoolExecutor'
+    }
+    OUTPUT_FORMATS = ('csv', 'xlsx', 'rows')
+    
+    def __init__(self, parsers: Dict[str, TransactionParser] = None, executor: Optional[str] = None, max_workers: Optional[int] = None,
+                 cache: Optional[ParseCache] = None, formatter: Optional[TransactionFormatter] = None,
+                 deduplicator: Optional[TransactionDeduplicator] = None, profiler: Profiler = NULL_PROFILER,
+                 store: Optional[TransactionStore] = None, categorizer: Optional[Categorizer] = None):
+        """``profiler`` is shared with the parsers and the formatter; parsers running
+        in a process pool are not profiled. With a ``store`` every parsed transaction
+        is saved to it and the output is written from the whole store. A ``categorizer``
+        tags every transaction with its spending category."""
+        if executor is not None and executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}', expected one of {list(self.EXECUTORS)}")
+        
         self.parsers = parsers or {}
-        self.formatter = TransactionFormatter()
+        self.profiler = profiler
+        self.formatter = formatter or TransactionFormatter()
+        self.formatter.profiler = profiler
+        self.executor = executor
+        self.max_workers = max_workers
+        self.cache = cache
+        self.deduplicator = deduplicator
+        self.store = store
+        self.categorizer = categorizer
+        self._pool = None
+        self._semaphores = weakref.WeakKeyDictionary()
+        
+        for name, parser in self.parsers.items():
+            self.add_parser(name, parser)
     
-    def process_files(self, file_mappings: Dict[str, str], output_file: str = "output.csv") -> None:
-        all_transactions = []
+    def process_files(self, file_mappings: Dict[str, str], output_file: str = "output.csv", incremental: bool = False) -> int:
+        """Write the output; return how many transactions were processed (stored, with a store), 0 when nothing was written."""
+        if incremental:
+            return self._process_incremental(file_mappings, output_file)
+        
+        counts = {}
         
-        for parser_name, file_path in file_mappings.items():
-            if file_path and parser_name in self.parsers:
-                transactions = self.parsers[parser_name].parse_file(file_path)
-                all_transactions.extend(transactions)
-                print(f"Processed {len(transactions)} {parser_name} transactions")
+        transactions = self.iter_transactions(file_mappings, counts)
+        if self.store is not None:
+            with self.profiler.stage("store.add"):
+                added = self.store.add(transactions)
+            print(f"Stored {added} new transactions in {self.store.path}")
+            transactions = iter(self.profiler.iter_stage("store.query", self.store.iter_transactions()))
+            if self.categorizer is not None:
+                transactions = self.categorizer.tag(transactions)
         
-        if not all_transactions:
+        first = next(transactions, None)
+        if first is None:
+            self._print_counts(counts)
             print("No transactions found.")
+            return 0
+        
+        transactions = chain([first], transactions)
+        if self.formatter.is_xlsx(output_file):
+            self.formatter.write_to_xlsx(transactions, output_file, presorted=True)
+        else:
+            self.formatter.write_to_csv(self.formatter.iter_formatted_rows(transactions, presorted=True), output_file)
+        IncrementalState.discard(output_file)
+        
+        self._print_counts(counts)
+        self._print_duplicates()
+        print(f"Total transactions processed: {sum(counts.values())}")
+        if self.store is not None:
+            stored = len(self.store)
+            print(f"Total transactions in store: {stored}")
+            return stored
+        return sum(counts.values())
+    
+    def process_members(self, file_mappings: Dict[str, Union[Source, List[Source]]], output_file: str = "output.csv",
+                        members: Optional[List[str]] = None, parser_name: str = "splitwise") -> Dict[str, int]:
+        """Write the Splitwise transactions of every member, reading each export once.
+
+        An ``.xlsx`` output gets one sheet per member; otherwise every member
+        gets its own file, named after ``output_file`` plus the member name.
+        Only the files of ``parser_name`` are read. Returns the count per member.
+        """
+        if self.store is not None:
+            raise ValueError("Member mode cannot be combined with a transaction store")
+        parser = self.parsers.get(parser_name)
+        if parser is None:
+            raise ValueError(f"No '{parser_name}' parser available for member mode")
+        
+        streams: Dict[str, List[List[Transaction]]] = {}
+        for _, source in self._jobs({parser_name: file_mappings.get(parser_name)}):
+            for member, transactions in parser.parse_members(source, members).items():
+                streams.setdefault(member, []).append(transactions)
+        
+        transactions_by_member = {}
+        for member, member_streams in streams.items():
+            transactions = heapq.merge(*member_streams, key=lambda x: x.date)
+            if self.categorizer is not None:
+                transactions = self.categorizer.tag(transactions)
+            transactions_by_member[member] = list(transactions)
+        
+        if not transactions_by_member:
+            print("No transactions found.")
+            return {}
+        
+        if self.formatter.is_xlsx(output_file):
+            self.formatter.write_members_xlsx(transactions_by_member, output_file)
+        else:
+            for member, transactions in transactions_by_member.items():
+                self.formatter.write_to_csv(self.formatter.iter_formatted_rows(transactions, presorted=True),
+                                            self.member_output_file(output_file, member))
+        
+        counts = {member: len(transactions) for member, transactions in transactions_by_member.items()}
+        for member, count in counts.items():
+            print(f"Processed {count} {parser_name} transactions of {member}")
+        return counts
+    
+    @staticmethod
+    def member_output_file(output_file: str, member: str) -> str:
+        """``output.csv.gz`` becomes ``output-<member>.csv.gz``."""
+        directory, name = os.path.split(output_file)
+        stem, dot, extensions = name.partition(".")
+        slug = re.sub(r"\W+", "-", member.lower()).strip("-") or "member"
+        return os.path.join(directory, f"{stem}-{slug}{dot}{extensions}")
+    
+    def _print_duplicates(self):
+        if self.deduplicator is None:
             return
+        for source_name, dropped in self.deduplicator.dropped.items():
+            print(f"Dropped {dropped} duplicate {source_name.lower()} transactions")
+    
+    def _print_counts(self, counts: Dict[str, int], label: str = ""):
+        for parser_name, count in counts.items():
+            print(f"Processed {count} {label}{parser_name} transactions")
+    
+    def _process_incremental(self, file_mappings: Dict[str, str], output_file: str) -> int:
+        if self.formatter.is_xlsx(output_file):
+            raise ValueError("Incremental mode only supports CSV output")
+        if self.store is not None:
+            raise ValueError("Incremental mode cannot be combined with a transaction store")
+        if self.formatter.has_total_rows or self.formatter.aggregates is not None:
+            raise ValueError("Incremental mode cannot be combined with subtotals or a summary report")
+        
+        state = IncrementalState.for_output(output_file)
+        has_output = os.path.exists(output_file)
+        if not has_output:
+            state = IncrementalState(state.path)
+        elif not state.matches(output_file):
+            raise ValueError(f"{output_file} was not written by an incremental run or has changed since; "
+                             f"delete it or regenerate it without --incremental")
+        
+        # Parsers skip the rows before each mark; only when something is new is the output read and rewritten
+        counts = {}
+        new_transactions = list(self.iter_transactions(file_mappings, counts, state))
+        
+        self._print_counts(counts, "new ")
+        self._print_duplicates()
+        
+        if not new_transactions:
+            print("No new transactions found.")
+            return 0
+        
+        if has_output:
+            formatted_rows = self.formatter.merge_transactions(self.formatter.read_csv(output_file), new_transactions,
+                                                               self._source_order(file_mappings))
+        else:
+            formatted_rows = self.formatter.format_transactions(new_transactions)
         
-        formatted_rows = self.formatter.format_transactions(all_transactions)
         self.formatter.write_to_csv(formatted_rows, output_file)
+        state.save(output_file)
+        
+        print(f"Total new transactions processed: {len(new_transactions)}")
+        return len(new_transactions)
+    
+    def iter_transactions(self, file_mappings: Dict[str, Union[Source, List[Source]]], counts: Optional[Dict[str, int]] = None,
+                          state: Optional[IncrementalState] = None) -> Iterator[Transaction]:
+        """Merge the per-file streams, ordered by month and then by mapping order.
+
+        A mapping value may be a list of files for the same parser, whose
+        transactions are merged by date; a file may also be given as bytes or
+        a binary file object.
+        """
+        jobs = self._jobs(file_mappings)
+        # With a state the parsers skip the rows before each mark, so their result is not the whole file to cache
+        cache = self.cache if state is None else None
+        since = [state.since(parser_name) if state is not None else None for parser_name, _ in jobs]
+        
+        sources = [None] * len(jobs)
+        keys = [None] * len(jobs)
+        if cache is not None:
+            with self.profiler.stage("cache.lookup"):
+                for i, (parser_name, file_path) in enumerate(jobs):
+                    keys[i] = self._cache_key(self.parsers[parser_name], file_path)
+                    if keys[i] is not None:
+                        sources[i] = cache.get(keys[i])
+        
+        pending = [i for i, source in enumerate(sources) if source is None]
+        if cache is not None:
+            self.profiler.count("cache.hits", len(jobs) - len(pending))
+        if self.executor and len(pending) > 1:
+            parsed = self._parse_concurrently([jobs[i] for i in pending], [since[i] for i in pending])
+            for i, transactions in zip(pending, parsed):
+                sources[i] = transactions
+        else:
+            for i in pending:
+                parser_name, file_path = jobs[i]
+                parser = self.parsers[parser_name]
+                if keys[i] is not None:
+                    sources[i] = parser.parse_file(file_path)
+                else:
+                    sources[i] = parser.iter_transactions(file_path, since[i])
+        
+        if cache is not None:
+            with self.profiler.stage("cache.store"):
+                for i in pending:
+                    # Parsers return nothing for a file they failed to read; do not remember that
+                    if keys[i] is not None and sources[i]:
+                        cache.put(keys[i], sources[i])
         
-        print(f"Total transactions processed: {len(all_transactions)}")
+        return self._merge(jobs, sources, counts, state)
+    
+    def _jobs(self, file_mappings: Dict[str, Union[Source, List[Source]]]) -> List[tuple]:
+        """``(parser name, source)`` of every file to parse."""
+        jobs = []
+        for parser_name, sources in file_mappings.items():
+            if not sources or parser_name not in self.parsers:
+                continue
+            sources = [source for source in sources if source] if isinstance(sources, (list, tuple)) else [sources]
+            jobs.extend((parser_name, source) for source in sources)
+        return jobs
+    
+    @staticmethod
+    def source_ranks(parser_names: Iterable[str]) -> List[int]:
+        """Mapping-order rank of the parser of every file; the files of one parser share it."""
+        ranks = {}
+        return [ranks.setdefault(parser_name, len(ranks)) for parser_name in parser_names]
+    
+    def _source_order(self, file_mappings: Dict[str, Union[Source, List[Source]]]) -> List[str]:
+        """Source prefixes in mapping order, the order of the groups inside a month."""
+        parser_names = dict.fromkeys(parser_name for parser_name, _ in self._jobs(file_mappings))
+        return [self.parsers[parser_name].get_source_prefix() for parser_name in parser_names]
+    
+    def _merge(self, jobs: List[tuple], sources: List[Iterable[Transaction]], counts: Optional[Dict[str, int]] = None,
+               state: Optional[IncrementalState] = None) -> Iterator[Transaction]:
+        streams = []
+        for file_index, ((parser_name, _), stream) in enumerate(zip(jobs, sources)):
+            if state is not None:
+                stream = state.filter_new(parser_name, stream)
+            if counts is not None:
+                stream = self._count(parser_name, stream, counts)
+            if self.deduplicator is not None:
+                stream = self._tag(stream, file_index)
+            streams.append(stream)
+        
+        ranks = self.source_ranks(parser_name for parser_name, _ in jobs)
+        if self.deduplicator is not None:
+            merged = self.deduplicator.filter(heapq.merge(*streams, key=lambda x: (x[0].month_ordinal, ranks[x[1]], x[0].date)))
+        elif len(set(ranks)) == len(ranks):
+            # One file per source: stream order already puts the sources of a month in mapping order
+            merged = heapq.merge(*streams, key=lambda x: x.month_ordinal)
+        else:
+            ranked = [zip(stream, repeat(rank)) for stream, rank in zip(streams, ranks)]
+            merged = map(itemgetter(0), heapq.merge(*ranked, key=lambda x: (x[0].month_ordinal, x[1], x[0].date)))
+        merged = iter(self.profiler.iter_stage("merge", merged))
+        
+        if self.categorizer is None:
+            return merged
+        return iter(self.profiler.iter_stage("categorize", self.categorizer.tag(merged)))
+    
+    async def aprocess(self, file_mappings: Dict[str, Union[Source, List[Source]]],
+                       output_format: str = 'csv') -> Union[bytes, List[List[str]]]:
+        """Parse and format without blocking the event loop; nothing is written to disk.
+
+        Files may be paths, bytes or binary file objects such as uploads. Each one
+        is parsed on a pool shared by every call (``executor``, threads by default,
+        with ``max_workers`` workers); a semaphore of the same size keeps the parses
+        in flight bounded, so a burst of uploads waits instead of piling up work.
+        Path inputs go through the parse cache when there is one. Every call
+        renders with its own copy of the formatter, so concurrent calls never
+        share subtotals. Returns CSV or xlsx bytes, or the formatted rows for ``'rows'``;
+        raises ``ParseError`` with the errors of this call when a file fails to parse.
+        """
+        import asyncio
+        
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {list(self.OUTPUT_FORMATS)}")
+        
+        loop = asyncio.get_running_loop()
+        jobs = self._jobs(file_mappings)
+        results = await asyncio.gather(*(self._aparse(loop, parser_name, source) for parser_name, source in jobs))
+        errors = [error for _, file_errors in results for error in file_errors]
+        if errors:
+            raise ParseError(errors)
+        
+        sources = [transactions for transactions, _ in results]
+        return await loop.run_in_executor(None, self._render, jobs, sources, output_format)
+    
+    async def _aparse(self, loop, parser_name: str, source: Source) -> Tuple[List[Transaction], List[str]]:
+        """The transactions of ``source`` and the errors its parse reported."""
+        import asyncio
+        
+        workers = self.max_workers or os.cpu_count() or 1
+        if self._pool is None:
+            executor_class = getattr(concurrent.futures, self.EXECUTORS[self.executor or 'thread'])
+            self._pool = executor_class(max_workers=workers)
+        # A semaphore belongs to the loop it first waited on, so every loop gets its own
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(workers)
+        
+        parser = self.parsers[parser_name]
+        key = None
+        if self.cache is not None and is_path(source):
+            key, cached = await loop.run_in_executor(None, self._cache_lookup, parser, source)
+            if cached is not None:
+                return cached, []
+        
+        async with semaphore:
+            if self.executor == 'process' and hasattr(source, "read"):
+                source = await loop.run_in_executor(None, source.read)
+            transactions, errors = await loop.run_in_executor(self._pool, parser.parse_file_with_errors, source)
+        
+        if key is not None and transactions and not errors:
+            await loop.run_in_executor(None, self.cache.put, key, transactions)
+        return transactions, errors
+    
+    def _cache_lookup(self, parser: TransactionParser, file_path: Source) -> tuple:
+        """``(cache key, cached transactions or None)``; hashing reads the whole file, so it runs off the loop."""
+        key = self._cache_key(parser, file_path)
+        return key, (self.cache.get(key) if key is not None else None)
+    
+    def _render(self, jobs: List[tuple], sources: List[List[Transaction]], output_format: str) -> Union[bytes, List[List[str]]]:
+        formatter = self.formatter.copy()
+        transactions = self._merge(jobs, sources)
+        if output_format == 'xlsx':
+            return formatter.to_xlsx_bytes(transactions, presorted=True)
+        
+        rows = formatter.iter_formatted_rows(transactions, presorted=True)
+        return list(rows) if output_format == 'rows' else formatter.to_csv_bytes(rows)
+    
+    def shutdown(self):
+        """Stop the worker pool used by ``aprocess``."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._semaphores.clear()
+    
+    def _parse_concurrently(self, jobs: List[tuple], since: List[Optional[datetime]]) -> List[List[Transaction]]:
+        """Parse every file on the configured pool; results keep the order of ``jobs``."""
+        executor_class = getattr(concurrent.futures, self.EXECUTORS[self.executor])
+        with executor_class(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.parsers[parser_name].parse_file_with_errors, file_path, file_since)
+                       for (parser_name, file_path), file_since in zip(jobs, since)]
+            results = [future.result() for future in futures]
+        
+        # Workers have their own error collectors; hand what they reported to the caller's
+        for _, errors in results:
+            record_errors(errors)
+        return [transactions for transactions, _ in results]
+    
+    def _cache_key(self, parser: TransactionParser, file_path: Source) -> Optional[str]:
+        if not is_path(file_path):
+            return None
+        try:
+            return self.cache.key_for(parser, file_path)
+        except OSError:
+            return None
+    
+    def _tag(self, transactions: Iterable[Transaction], file_index: int) -> Iterator[tuple]:
+        for transaction in transactions:
+            yield transaction, file_index
+    
+    def _count(self, parser_name: str, transactions: Iterable[Transaction], counts: Dict[str, int]) -> Iterator[Transaction]:
+        counts.setdefault(parser_name, 0)
+        for transaction in transactions:
+            counts[parser_name] += 1
+            yield transaction
     
     def add_parser(self, name: str, parser: TransactionParser):
+        if self.profiler.enabled:
+            parser.profiler = self.profiler
         self.parsers[name] = parser
     
     def remove_parser(self, name: str):
@@ -36,14 +407,12 @@ class TransactionProcessor:
     def get_available_parsers(self) -> List[str]:
         return list(self.parsers.keys())
     
-    def get_transaction_summary(self, transactions: List[Transaction]) -> dict:
-        source_counts = {}
-        for transaction in transactions:
-            source_type = transaction.source_type.name
-            source_counts[source_type] = source_counts.get(source_type, 0) + 1
-        
-        return {
-            'total_transactions': len(transactions),
-            'total_amount': sum(t.amount for t in transactions),
-            'by_source': source_counts
-        }
\ No newline at end of file
+    def get_transaction_summary(self, transactions: Union[List[Transaction], TransactionBatch, None] = None) -> dict:
+        """Summary of ``transactions``, or of the whole store when none are given."""
+        if transactions is None:
+            if self.store is None:
+                raise ValueError("No transactions given and no transaction store configured")
+            return self.store.summary()
+        if isinstance(transactions, TransactionBatch):
+            return transactions.summary()
+        return MonthlyAggregates.from_transactions(transactions).summary()
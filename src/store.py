@@ -0,0 +1,131 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+from models import Transaction, BackType
+
+class TransactionStore:
+    """SQLite database of every transaction ever parsed.
+
+    Rows are keyed by the transaction fingerprint plus an occurrence number, so
+    identical purchases on the same day are kept apart while adding the same
+    export twice changes nothing. Output and summaries are read back in month
+    order straight from the indexes.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            key TEXT NOT NULL UNIQUE,
+            source_type INTEGER NOT NULL,
+            source_prefix TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            month_ordinal INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS transactions_month ON transactions (month_ordinal, source_type, date);
+        CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+        CREATE INDEX IF NOT EXISTS transactions_source ON transactions (source_type, date);
+        CREATE INDEX IF NOT EXISTS transactions_amount ON transactions (amount_cents);
+    """
+    COLUMNS = "description, amount_cents, date, source_type, source_prefix"
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(self.SCHEMA)
+    
+    def __enter__(self) -> "TransactionStore":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self.connection.close()
+    
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    
+    def add(self, transactions: Iterable[Transaction]) -> int:
+        """Insert the transactions not stored yet in a single SQLite transaction, return how many were new."""
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO transactions (key, source_type, source_prefix, description, amount_cents, date, month_ordinal) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO NOTHING",
+                self._rows(transactions))
+        return self.connection.total_changes - before
+    
+    def _rows(self, transactions: Iterable[Transaction]) -> Iterator[tuple]:
+        occurrences = Counter()
+        for transaction in transactions:
+            fingerprint = transaction.fingerprint()
+            occurrences[fingerprint] += 1
+            yield (f"{fingerprint}:{occurrences[fingerprint]}", transaction.source_type.value, transaction.source_prefix,
+                   transaction.description, transaction.amount_cents, transaction.date.isoformat(),
+                   transaction.month_ordinal)
+    
+    def iter_transactions(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          source_type: Optional[BackType] = None) -> Iterator[Transaction]:
+        """Yield the stored transactions ordered by month, source and date, optionally in ``[start, end)``."""
+        conditions, parameters = self._where(start, end, source_type)
+        cursor = self.connection.execute(
+            f"SELECT {self.COLUMNS} FROM transactions{conditions} ORDER BY month_ordinal, source_type, date, id",
+            parameters)
+        
+        for description, amount_cents, date, source_type, source_prefix in cursor:
+            yield Transaction(description, amount_cents, datetime.fromisoformat(date), BackType(source_type), source_prefix)
+    
+    def month_totals(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Dict[str, float]]:
+        """Spent amount per ``YYYY-MM`` month and source."""
+        conditions, parameters = self._where(start, end)
+        cursor = self.connection.execute(
+            f"SELECT month_ordinal, source_type, SUM(amount_cents) FROM transactions{conditions} "
+            f"GROUP BY month_ordinal, source_type ORDER BY month_ordinal, source_type", parameters)
+        
+        totals = {}
+        for month, source_type, cents in cursor:
+            totals.setdefault(self._month_key(month), {})[BackType(source_type).name] = cents / 100
+        return totals
+    
+    def summary(self) -> dict:
+        """Same shape as ``TransactionBatch.summary``, aggregated by SQLite."""
+        execute = self.connection.execute
+        total_transactions, total_cents = execute("SELECT COUNT(*), COALESCE(SUM(amount_cents), 0) FROM transactions").fetchone()
+        by_source = execute("SELECT source_type, COUNT(*), SUM(amount_cents) FROM transactions "
+                            "GROUP BY source_type ORDER BY source_type").fetchall()
+        by_month = execute("SELECT month_ordinal, SUM(amount_cents) FROM transactions "
+                           "GROUP BY month_ordinal ORDER BY month_ordinal").fetchall()
+        
+        amount_by_year = Counter()
+        for month, cents in by_month:
+            amount_by_year[month // 12] += cents
+        
+        return {
+            'total_transactions': total_transactions,
+            'total_amount': total_cents / 100,
+            'by_source': {BackType(code).name: count for code, count, _ in by_source},
+            'amount_by_source': {BackType(code).name: cents / 100 for code, _, cents in by_source},
+            'amount_by_month': {self._month_key(month): cents / 100 for month, cents in by_month},
+            'amount_by_year': {year: cents / 100 for year, cents in sorted(amount_by_year.items())}
+        }
+    
+    def _where(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               source_type: Optional[BackType] = None) -> tuple:
+        conditions, parameters = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            parameters.append(start.isoformat())
+        if end is not None:
+            conditions.append("date < ?")
+            parameters.append(end.isoformat())
+        if source_type is not None:
+            conditions.append("source_type = ?")
+            parameters.append(source_type.value)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+    
+    @staticmethod
+    def _month_key(month_ordinal: int) -> str:
+        return f"{month_ordinal // 12}-{month_ordinal % 12 + 1:02d}"
@@ -1,7 +1,19 @@
 import unittest
+import unittest.mock
+import contextlib
+import asyncio
+import csv
+import io
+import gzip
+import shutil
+import subprocess
+import json
 import tempfile
 import os
+import re
+import zipfile
 import sys
+from datetime import datetime
 from pathlib import Path
 import openpyxl
 from openpyxl import Workbook
@@ -11,6 +23,23 @@ from parser.splitwise_parser import SplitwiseParser
 from parser.paypal_parser import PaypalParser
 from formatter import TransactionFormatter
 from processor import TransactionProcessor
+from models import Transaction, BackType
+from batch import load_manifest, run_batch
+from cache import ParseCache
+from dedup import TransactionDeduplicator, normalize_description
+from parser.registry import ParserRegistry
+from parser.detect import SourceDetector, expand_inputs
+from watcher import WatchSession
+from instrumentation import Profiler
+from benchmarks.generators import (GENERATORS, generate_paypal, generate_splitwise, splitwise_members, splitwise_rows,
+                                   synthetic_transactions, category_rules, categorized_transactions)
+from parser.chunked import parse_chunked
+from aggregates import MonthlyAggregates
+from store import TransactionStore
+from incremental import IncrementalState
+from transaction_batch import TransactionBatch
+from parser.parser import ParseError, collect_errors
+from categories import Categorizer, CategoryRule
 
 class SplitWiseTransformationTest(unittest.TestCase):
     def test_transformation_with_temp_files(self):
@@ -28,11 +57,11 @@ class SplitWiseTransformationTest(unittest.TestCase):
                 output_content = file.read()
                 rows = output_content.splitlines()
             
-            self.assertIn("⬜⬜⬜⬜  Apr  ⬜⬜⬜⬜", rows[0])
+            self.assertIn("⬜⬜⬜⬜  Apr 2025  ⬜⬜⬜⬜", rows[0])
             self.assertIn("(Split) Cena da mario;;25,00€;Apr", output_content)
             self.assertIn("(Split) spesa;;35,00€;Apr", output_content)
             self.assertIn("(Split) Mercato;;7,50€;May", output_content)
-            self.assertIn("⬜⬜⬜⬜  May  ⬜⬜⬜⬜", rows[3])
+            self.assertIn("⬜⬜⬜⬜  May 2025  ⬜⬜⬜⬜", rows[3])
             self.assertNotIn("Cena da mario 2", output_content)
             
             output_lines = output_content.strip().split('\n')
@@ -57,7 +86,7 @@ class SatispayTransformationTest(unittest.TestCase):
                 output_lines = output_content.splitlines()
             
             expected_output = [
-                '⬜⬜⬜⬜  Apr  ⬜⬜⬜⬜',
+                '⬜⬜⬜⬜  Apr 2025  ⬜⬜⬜⬜',
                 '(Satispay) Bar Rossi;;8,00€;Apr',
                 '(Satispay) Bar Rossi;;9,00€;Apr',
                 '(Satispay) Bus;;3,70€;Apr',
@@ -73,6 +102,19 @@ class SatispayTransformationTest(unittest.TestCase):
             if os.path.exists(output_file_path):
                 os.unlink(output_file_path)
 
+    def test_wrong_dimension_record_does_not_drop_rows(self):
+        source = "./tests/resources/satispay-example.xlsx"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            broken = os.path.join(tmpdir, "satispay.xlsx")
+            with zipfile.ZipFile(source) as original, zipfile.ZipFile(broken, "w") as copy:
+                for item in original.infolist():
+                    data = original.read(item.filename)
+                    if item.filename.startswith("xl/worksheets/sheet"):
+                        data = re.sub(rb'<dimension ref="[^"]*"/>', b'<dimension ref="A1:H2"/>', data)
+                    copy.writestr(item, data)
+            
+            self.assertEqual(SatispayParser().parse_file(broken), SatispayParser().parse_file(source))
+
 class PaypalTransformationTest(unittest.TestCase):
     def test_transformation(self):
         input_paypal_file_path = "./tests/resources/paypal-example.csv"
@@ -88,7 +130,7 @@ class PaypalTransformationTest(unittest.TestCase):
                 output_content = file.read()
                 rows_paypal = output_content.splitlines()
             
-            self.assertIn("⬜⬜⬜⬜  Feb  ⬜⬜⬜⬜", rows_paypal[0])
+            self.assertIn("⬜⬜⬜⬜  Feb 2025  ⬜⬜⬜⬜", rows_paypal[0])
             self.assertIn("(Paypal) Viaggi Marco Polo SRL;;35,50€;Feb", output_content)
             self.assertIn("(Paypal) Clinica Salute Plus SRL;;75,00€;Feb", output_content)
         finally:
@@ -121,10 +163,10 @@ class AcceptanceCriteriaTest(unittest.TestCase):
                 output_lines = output_content.strip().split('\n')
             
             expected_output = [
-                '⬜⬜⬜⬜  Feb  ⬜⬜⬜⬜',
+                '⬜⬜⬜⬜  Feb 2025  ⬜⬜⬜⬜',
                 '(Paypal) Viaggi Marco Polo SRL;;35,50€;Feb',
                 '(Paypal) Clinica Salute Plus SRL;;75,00€;Feb',
-                '⬜⬜⬜⬜  Apr  ⬜⬜⬜⬜',
+                '⬜⬜⬜⬜  Apr 2025  ⬜⬜⬜⬜',
                 '(Split) Cena da mario;;25,00€;Apr',
                 '(Split) spesa;;35,00€;Apr',
                 '""',
@@ -136,7 +178,7 @@ class AcceptanceCriteriaTest(unittest.TestCase):
                 '(Satispay) Bus;;3,70€;Apr',
                 '(Satispay) Caffè;;2,00€;Apr',
                 '(Satispay) Craft Beers;;12,00€;Apr',
-                '⬜⬜⬜⬜  May  ⬜⬜⬜⬜',
+                '⬜⬜⬜⬜  May 2025  ⬜⬜⬜⬜',
                 '(Split) Mercato;;7,50€;May',
                 '""',
                 '(Paypal) Mario Rossi;;18,50€;May',
@@ -151,5 +193,839 @@ class AcceptanceCriteriaTest(unittest.TestCase):
             if os.path.exists(output_file_path):
                 os.unlink(output_file_path)
 
+class MultiYearFormattingTest(unittest.TestCase):
+    def test_same_month_of_different_years_is_not_merged(self):
+        transactions = [
+            Transaction("Affitto", 50000, datetime(2025, 1, 5), BackType.PAYPAL, "(Paypal)"),
+            Transaction("Cena", 2500, datetime(2024, 12, 31), BackType.SPLITWISE, "(Split)"),
+            Transaction("Affitto", 48000, datetime(2024, 1, 5), BackType.PAYPAL, "(Paypal)")
+        ]
+        
+        rows = TransactionFormatter().format_transactions(transactions)
+        
+        self.assertEqual(rows, [
+            ["⬜⬜⬜⬜  Jan 2024  ⬜⬜⬜⬜"],
+            ["(Paypal) Affitto", "", "480,00€", "Jan"],
+            ["⬜⬜⬜⬜  Dec 2024  ⬜⬜⬜⬜"],
+            ["(Split) Cena", "", "25,00€", "Dec"],
+            ["⬜⬜⬜⬜  Jan 2025  ⬜⬜⬜⬜"],
+            ["(Paypal) Affitto", "", "500,00€", "Jan"]
+        ])
+
+class XlsxOutputTest(unittest.TestCase):
+    def test_writes_one_sheet_per_year_with_numeric_amounts(self):
+        transactions = [
+            Transaction("Cena", 2500, datetime(2024, 12, 31), BackType.SPLITWISE, "(Split)"),
+            Transaction("Affitto", 50000, datetime(2025, 1, 5), BackType.PAYPAL, "(Paypal)"),
+            Transaction("Bus", 370, datetime(2025, 1, 7), BackType.SATISPAY, "(Satispay)")
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            output_file_path = os.path.join(directory, "output.xlsx")
+            TransactionFormatter().write_to_xlsx(transactions, output_file_path)
+            workbook = openpyxl.load_workbook(output_file_path)
+        
+        self.assertEqual(workbook.sheetnames, ["2024", "2025"])
+        rows = [[cell.value for cell in row] for row in workbook["2025"].iter_rows()]
+        self.assertEqual(rows[0][0], "⬜⬜⬜⬜  Jan 2025  ⬜⬜⬜⬜")
+        self.assertEqual(rows[1], ["(Paypal) Affitto", None, 500.0, "Jan"])
+        self.assertEqual(rows[3], ["(Satispay) Bus", None, 3.7, "Jan"])
+        self.assertEqual(workbook["2025"]["C2"].number_format, TransactionFormatter.EURO_FORMAT)
+
+class OutputWriterTest(unittest.TestCase):
+    def test_failed_write_keeps_previous_output(self):
+        formatter = TransactionFormatter()
+        
+        def failing_rows():
+            yield ["(Paypal) Affitto", "", "500,00€", "Jan"]
+            raise RuntimeError("boom")
+        
+        with tempfile.TemporaryDirectory() as directory:
+            output_file_path = os.path.join(directory, "output.csv")
+            formatter.write_to_csv([["previous"]], output_file_path)
+            
+            with self.assertRaises(RuntimeError):
+                formatter.write_to_csv(failing_rows(), output_file_path)
+            
+            self.assertEqual(formatter.read_csv(output_file_path), [["previous"]])
+            self.assertEqual(os.listdir(directory), ["output.csv"])
+    
+    def test_gzip_output_round_trip(self):
+        formatter = TransactionFormatter()
+        transactions = PaypalParser().parse_file("./tests/resources/paypal-example.csv")
+        with tempfile.TemporaryDirectory() as directory:
+            output_file_path = os.path.join(directory, "output.csv.gz")
+            formatter.write_to_csv(formatter.iter_formatted_rows(transactions), output_file_path)
+            with gzip.open(output_file_path, 'rt', encoding='utf-8') as file:
+                self.assertIn("(Paypal) Mario Rossi;;18,50€;May", file.read())
+            self.assertEqual(formatter.read_csv(output_file_path), formatter.format_transactions(transactions))
+    
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_rewrite_keeps_permissions_without_touching_umask(self):
+        formatter = TransactionFormatter()
+        with tempfile.TemporaryDirectory() as directory:
+            output_file_path = os.path.join(directory, "output.csv")
+            formatter.write_to_csv([["previous"]], output_file_path)
+            os.chmod(output_file_path, 0o600)
+            
+            with unittest.mock.patch('os.umask', side_effect=AssertionError("umask changed")), \
+                 contextlib.redirect_stdout(io.StringIO()):
+                formatter.write_to_csv([["next"]], output_file_path)
+            
+            self.assertEqual(os.stat(output_file_path).st_mode & 0o777, 0o600)
+            self.assertEqual(formatter.read_csv(output_file_path), [["next"]])
+
+class DeduplicationTest(unittest.TestCase):
+    def test_overlapping_exports_of_same_source(self):
+        paypal_file = "./tests/resources/paypal-example.csv"
+        deduplicator = TransactionDeduplicator()
+        processor = TransactionProcessor({'paypal': PaypalParser()}, deduplicator=deduplicator)
+        
+        merged = list(processor.iter_transactions({'paypal': [paypal_file, paypal_file]}))
+        
+        self.assertEqual(merged, PaypalParser().parse_file(paypal_file))
+        self.assertEqual(deduplicator.dropped, {'PAYPAL': 6})
+    
+    def test_cross_source_tolerance_window(self):
+        paypal = Transaction("Bar Rossi", 800, datetime(2025, 4, 26), BackType.PAYPAL, "(Paypal)")
+        satispay = Transaction("bar rossi ", 800, datetime(2025, 4, 27, 22, 16), BackType.SATISPAY, "(Satispay)")
+        same_file = Transaction("Bar Rossi", 800, datetime(2025, 4, 26), BackType.PAYPAL, "(Paypal)")
+        tagged = [(paypal, 0), (same_file, 0), (satispay, 1)]
+        
+        self.assertEqual(list(TransactionDeduplicator(0).filter(tagged)), [paypal, same_file, satispay])
+        
+        deduplicator = TransactionDeduplicator(1)
+        self.assertEqual(list(deduplicator.filter(tagged)), [paypal, same_file])
+        self.assertEqual(deduplicator.dropped, {'SATISPAY': 1})
+
+class ParserRegistryTest(unittest.TestCase):
+    def test_csv_only_run_does_not_import_openpyxl(self):
+        code = ("import sys, main; "
+                "main.ParserRegistry().create('paypal'); "
+                "print(sorted(m for m in ('openpyxl', 'parser.satispay_parser', 'parser.paypal_parser') if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "['parser.paypal_parser']")
+    
+    def test_config_registers_parser(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "parsers.json")
+            with open(config_path, 'w', encoding='utf-8') as file:
+                json.dump([{"name": "paypal-business", "label": "PayPal Business",
+                            "target": "parser.paypal_parser:PaypalParser"}], file)
+            registry = ParserRegistry()
+            registry.load_config(config_path)
+        
+        self.assertEqual(registry.names(), ['splitwise', 'paypal', 'satispay', 'paypal-business'])
+        self.assertIsInstance(registry.create('paypal-business'), PaypalParser)
+    
+    def test_cli_reads_config_registered_parser(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "parsers.json")
+            output_file = os.path.join(directory, "output.csv")
+            with open(config_path, 'w', encoding='utf-8') as file:
+                json.dump([{"name": "paypal-business", "label": "PayPal Business",
+                            "target": "parser.paypal_parser:PaypalParser"}], file)
+            
+            result = subprocess.run([sys.executable, "main.py", "--parsers-config", config_path,
+                                     "--paypal-business", "./tests/resources/paypal-example.csv",
+                                     "--skip-splitwise", "--skip-paypal", "--skip-satispay", "--no-cache", "-o", output_file],
+                                    cwd=Path(__file__).parent.parent, capture_output=True, text=True)
+            
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            with open(output_file, 'r', encoding='utf-8') as file:
+                self.assertIn("(Paypal) Mario Rossi", file.read())
+
+class SourceDetectionTest(unittest.TestCase):
+    def test_routes_files_by_header(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("splitwise-example.csv", "paypal-example.csv", "satispay-example.xlsx"):
+                shutil.copy(os.path.join("./tests/resources", name), os.path.join(directory, name.replace("-example", "")))
+            with open(os.path.join(directory, "notes.csv"), 'w', encoding='utf-8') as file:
+                file.write("a,b,c\n1,2,3\n")
+            cache_path = os.path.join(directory, "cache", "detected.json")
+            
+            detector = SourceDetector(ParserRegistry(), cache_path)
+            file_mappings, unknown = detector.route(expand_inputs([directory]))
+            
+            self.assertEqual(file_mappings, {
+                'paypal': [os.path.join(directory, "paypal.csv")],
+                'satispay': [os.path.join(directory, "satispay.xlsx")],
+                'splitwise': [os.path.join(directory, "splitwise.csv")]
+            })
+            self.assertEqual(unknown, [os.path.join(directory, "notes.csv")])
+            
+            warm = SourceDetector(ParserRegistry(), cache_path)
+            warm._sniff = None
+            self.assertEqual(warm.detect(os.path.join(directory, "paypal.csv")), 'paypal')
+
+    def test_detection_reads_only_the_head_of_a_file(self):
+        class CountingFile:
+            def __init__(self, file):
+                self.file = file
+                self.bytes_read = 0
+            
+            def read(self, size=-1):
+                data = self.file.read(size)
+                self.bytes_read += len(data)
+                return data
+            
+            def __getattr__(self, name):
+                return getattr(self.file, name)
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc_info):
+                self.file.close()
+        
+        real_open = open
+        opened = []
+        def counting_open(*args, **kwargs):
+            opened.append(CountingFile(real_open(*args, **kwargs)))
+            return opened[-1]
+        
+        with tempfile.TemporaryDirectory() as directory:
+            paypal_path = os.path.join(directory, "paypal.csv")
+            generate_paypal(paypal_path, 2000)
+            self.assertGreater(os.path.getsize(paypal_path), 10 * SourceDetector.SNIFF_BYTES)
+            
+            detector = SourceDetector(ParserRegistry())
+            with unittest.mock.patch("builtins.open", counting_open):
+                self.assertEqual(detector.detect(paypal_path), 'paypal')
+                self.assertEqual(detector.detect(paypal_path), 'paypal')
+        
+        self.assertEqual(len(opened), 1)
+        self.assertLessEqual(opened[0].bytes_read, SourceDetector.SNIFF_BYTES)
+
+class WatchSessionTest(unittest.TestCase):
+    def test_reparses_only_changed_file(self):
+        with open("./tests/resources/paypal-example.csv", 'r', encoding='utf-8') as file:
+            paypal_lines = file.readlines()
+        
+        with tempfile.TemporaryDirectory() as directory:
+            paypal_path = os.path.join(directory, "paypal.csv")
+            watch_output = os.path.join(directory, "watch.csv")
+            full_output = os.path.join(directory, "full.csv")
+            with open(paypal_path, 'w', encoding='utf-8') as file:
+                file.writelines(paypal_lines[:6])
+            
+            parsers = {'splitwise': SplitwiseParser(), 'paypal': PaypalParser()}
+            file_mappings = {'splitwise': ["./tests/resources/splitwise-example.csv"], 'paypal': [paypal_path]}
+            session = WatchSession(TransactionProcessor(parsers), lambda: file_mappings, watch_output)
+            
+            self.assertTrue(session.poll())
+            self.assertFalse(session.poll())
+            
+            with open(paypal_path, 'w', encoding='utf-8') as file:
+                file.writelines(paypal_lines)
+            os.utime(paypal_path, ns=(0, 10 ** 18))
+            parsed = []
+            parsers['splitwise'].iter_transactions = lambda path: parsed.append(path) or iter(())
+            
+            self.assertTrue(session.poll())
+            self.assertEqual(parsed, [])
+            
+            TransactionProcessor({'splitwise': SplitwiseParser(), 'paypal': PaypalParser()}).process_files(file_mappings, full_output)
+            with open(watch_output, 'r', encoding='utf-8') as file:
+                watch_content = file.read()
+            with open(full_output, 'r', encoding='utf-8') as file:
+                self.assertEqual(watch_content, file.read())
+
+    def test_dedup_across_files_matches_full_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            copies = [os.path.join(directory, name) for name in ("paypal-a.csv", "paypal-b.csv")]
+            for path in copies:
+                shutil.copy("./tests/resources/paypal-example.csv", path)
+            watch_output = os.path.join(directory, "watch.csv")
+            full_output = os.path.join(directory, "full.csv")
+            file_mappings = {'paypal': copies}
+            
+            processor = TransactionProcessor({'paypal': PaypalParser()}, deduplicator=TransactionDeduplicator(1))
+            session = WatchSession(processor, lambda: file_mappings, watch_output)
+            self.assertTrue(session.poll())
+            
+            os.utime(copies[1], ns=(0, 10 ** 18))
+            self.assertTrue(session.poll())
+            self.assertEqual(processor.deduplicator.dropped['PAYPAL'], 6)
+            
+            TransactionProcessor({'paypal': PaypalParser()}, deduplicator=TransactionDeduplicator(1)).process_files(file_mappings, full_output)
+            with open(watch_output, 'r', encoding='utf-8') as file:
+                watch_content = file.read()
+            with open(full_output, 'r', encoding='utf-8') as file:
+                self.assertEqual(watch_content, file.read())
+
+class MultiFileMergeTest(unittest.TestCase):
+    def test_files_of_one_source_merge_by_date(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = {"a.csv": [("1/4/2025", "A1"), ("20/4/2025", "A20")], "b.csv": [("10/4/2025", "B10")]}
+            for name, rows in files.items():
+                with open(os.path.join(directory, name), 'w', encoding='utf-8', newline='') as file:
+                    writer = csv.writer(file)
+                    writer.writerow(["Data", "Nome", "Descrizione", "Lordo"])
+                    writer.writerows([date, shop, "Pagamento", "-10,00"] for date, shop in rows)
+            file_mappings = {'paypal': [os.path.join(directory, name) for name in files],
+                             'splitwise': ["./tests/resources/splitwise-example.csv"]}
+            
+            for deduplicator in (None, TransactionDeduplicator(0)):
+                with self.subTest(dedup=deduplicator is not None):
+                    processor = TransactionProcessor({'paypal': PaypalParser(), 'splitwise': SplitwiseParser()},
+                                                     deduplicator=deduplicator)
+                    april = [t for t in processor.iter_transactions(file_mappings) if t.month_ordinal == 2025 * 12 + 3]
+                    self.assertEqual([t.description for t in april[:3]], ["A1", "B10", "A20"])
+                    self.assertGreater(len(april), 3)
+                    self.assertTrue(all(t.source_type == BackType.SPLITWISE for t in april[3:]))
+            
+            session = WatchSession(TransactionProcessor({'paypal': PaypalParser(), 'splitwise': SplitwiseParser()}),
+                                   lambda: file_mappings, os.path.join(directory, "watch.csv"))
+            session.poll()
+            april = list(session._month_transactions(2025 * 12 + 3))
+            self.assertEqual([t.description for t in april[:3]], ["A1", "B10", "A20"])
+            self.assertTrue(all(t.source_type == BackType.SPLITWISE for t in april[3:]))
+
+class ParallelProcessingTest(unittest.TestCase):
+    def test_executor_output_matches_serial(self):
+        file_mappings = {
+            'splitwise': "./tests/resources/splitwise-example.csv",
+            'paypal': "./tests/resources/paypal-example.csv",
+            'satispay': "./tests/resources/satispay-example.xlsx"
+        }
+        outputs = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for executor in (None, 'thread', 'process'):
+                parsers = {
+                    'splitwise': SplitwiseParser(),
+                    'paypal': PaypalParser(),
+                    'satispay': SatispayParser()
+                }
+                output_file_path = os.path.join(directory, f"output-{executor}.csv")
+                processor = TransactionProcessor(parsers, executor=executor, max_workers=3)
+                processor.process_files(file_mappings, output_file_path)
+                with open(output_file_path, 'rb') as file:
+                    outputs[executor] = file.read()
+        
+        self.assertEqual(outputs[None], outputs['thread'])
+        self.assertEqual(outputs[None], outputs['process'])
+
+class BatchTest(unittest.TestCase):
+    def test_batch_reports_failures_without_aborting(self):
+        resources = Path("./tests/resources").resolve()
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "taken"))
+            manifest_path = os.path.join(directory, "manifest.json")
+            with open(manifest_path, 'w', encoding='utf-8') as file:
+                json.dump({"jobs": [
+                    {"name": "broken", "paypal": str(resources / "paypal-example.csv"), "output": "taken"},
+                    {"name": "missing", "paypal": "nope.csv", "output": "missing.csv"},
+                    {"name": "garbage", "paypal": "garbage.csv", "output": "garbage.csv.out"},
+                    {"name": "half", "paypal": "garbage.csv", "splitwise": str(resources / "splitwise-example.csv"),
+                     "output": "half.csv"},
+                    {"name": "christian", "owner": "christian rocchetti",
+                     "splitwise": str(resources / "splitwise-example.csv"),
+                     "paypal": str(resources / "paypal-example.csv"), "output": "christian.csv"}
+                ]}, file)
+            
+            with open(os.path.join(directory, "garbage.csv"), 'w', encoding='utf-8') as file:
+                file.write("not,a,paypal\nexport,at,all\n")
+            
+            results = run_batch(load_manifest(manifest_path))
+            
+            self.assertEqual([result.job.name for result in results], ["broken", "missing", "garbage", "half", "christian"])
+            self.assertEqual([result.ok for result in results], [False, False, False, False, True])
+            self.assertIn("missing input", results[1].error)
+            self.assertIn("Error parsing PayPal file", results[3].error)
+            with open(os.path.join(directory, "christian.csv"), 'r', encoding='utf-8') as file:
+                output_content = file.read()
+            self.assertIn("(Split) Cena da mario;;25,00€;Apr", output_content)
+            self.assertIn("(Paypal) Mario Rossi;;18,50€;May", output_content)
+
+    def test_directory_owner_must_be_a_splitwise_member(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for owner in ("Giovanna", "bob"):
+                os.mkdir(os.path.join(directory, owner))
+                shutil.copy("./tests/resources/splitwise-example.csv", os.path.join(directory, owner, "splitwise.csv"))
+            
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = run_batch(load_manifest(directory))
+        
+        self.assertEqual([(result.job.name, result.ok) for result in results], [("Giovanna", True), ("bob", False)])
+        self.assertIn("'bob' is not a member", results[1].error)
+
+class ParseCacheTest(unittest.TestCase):
+    def test_warm_run_skips_parsing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ParseCache(os.path.join(directory, "cache"))
+            parser = SplitwiseParser()
+            processor = TransactionProcessor({'splitwise': parser}, cache=cache)
+            file_mappings = {'splitwise': "./tests/resources/splitwise-example.csv"}
+            
+            cold = list(processor.iter_transactions(file_mappings))
+            parser.iter_transactions = None
+            warm = list(processor.iter_transactions(file_mappings))
+            
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(warm, cold)
+            
+            other_owner = SplitwiseParser("Giovanna")
+            self.assertNotEqual(cache.key_for(parser, file_mappings['splitwise']),
+                                cache.key_for(other_owner, file_mappings['splitwise']))
+    
+    def test_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ParseCache(directory, max_bytes=0)
+            transactions = SplitwiseParser().parse_file("./tests/resources/splitwise-example.csv")
+            cache.put("a", transactions)
+            self.assertIsNone(cache.get("a"))
+
+class IncrementalTest(unittest.TestCase):
+    def test_incremental_runs_match_full_run(self):
+        with open("./tests/resources/paypal-example.csv", 'r', encoding='utf-8') as file:
+            paypal_lines = file.readlines()
+        
+        with tempfile.TemporaryDirectory() as directory:
+            paypal_path = os.path.join(directory, "paypal.csv")
+            incremental_output = os.path.join(directory, "incremental.csv")
+            full_output = os.path.join(directory, "full.csv")
+            
+            def processor():
+                return TransactionProcessor({'splitwise': SplitwiseParser(), 'paypal': PaypalParser()})
+            file_mappings = {'splitwise': "./tests/resources/splitwise-example.csv", 'paypal': paypal_path}
+            
+            with open(paypal_path, 'w', encoding='utf-8') as file:
+                file.writelines(paypal_lines[:6])
+            processor().process_files(file_mappings, incremental_output, incremental=True)
+            
+            with open(paypal_path, 'w', encoding='utf-8') as file:
+                file.writelines(paypal_lines)
+            processor().process_files(file_mappings, incremental_output, incremental=True)
+            processor().process_files(file_mappings, incremental_output, incremental=True)
+            processor().process_files(file_mappings, full_output)
+            
+            with open(incremental_output, 'r', encoding='utf-8') as file:
+                incremental_content = file.read()
+            with open(full_output, 'r', encoding='utf-8') as file:
+                full_content = file.read()
+            
+            self.assertEqual(incremental_content, full_content)
+    
+    def test_source_new_to_a_month_keeps_mapping_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            incremental_output = os.path.join(directory, "incremental.csv")
+            full_output = os.path.join(directory, "full.csv")
+            
+            def processor():
+                return TransactionProcessor({'splitwise': SplitwiseParser(), 'paypal': PaypalParser()})
+            file_mappings = {'splitwise': "./tests/resources/splitwise-example.csv",
+                             'paypal': "./tests/resources/paypal-example.csv"}
+            
+            processor().process_files({'paypal': file_mappings['paypal']}, incremental_output, incremental=True)
+            processor().process_files(file_mappings, incremental_output, incremental=True)
+            processor().process_files(file_mappings, full_output)
+            
+            with open(incremental_output, 'r', encoding='utf-8') as file:
+                incremental_content = file.read()
+            with open(full_output, 'r', encoding='utf-8') as file:
+                full_content = file.read()
+            
+            self.assertEqual(incremental_content, full_content)
+    
+    def test_parsers_skip_rows_before_since(self):
+        for parser, filepath in ((PaypalParser(), "./tests/resources/paypal-example.csv"),
+                                 (SplitwiseParser(), "./tests/resources/splitwise-example.csv"),
+                                 (SatispayParser(), "./tests/resources/satispay-example.xlsx")):
+            with self.subTest(parser=type(parser).__name__):
+                transactions = parser.parse_file(filepath)
+                since = transactions[-1].date
+                expected = [t for t in transactions if t.date >= since]
+                self.assertLess(len(expected), len(transactions))
+                self.assertEqual(parser.parse_file(filepath, since), expected)
+    
+    def test_run_without_new_rows_leaves_output_alone(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_file = os.path.join(directory, "output.csv")
+            file_mappings = {'paypal': "./tests/resources/paypal-example.csv"}
+            processor = TransactionProcessor({'paypal': PaypalParser()})
+            processor.process_files(file_mappings, output_file, incremental=True)
+            
+            with unittest.mock.patch.object(processor.formatter, 'read_csv') as read_csv, \
+                 unittest.mock.patch.object(processor.formatter, 'write_to_csv') as write_to_csv:
+                self.assertEqual(processor.process_files(file_mappings, output_file, incremental=True), 0)
+            read_csv.assert_not_called()
+            write_to_csv.assert_not_called()
+    
+    def test_refuses_output_without_matching_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_file = os.path.join(directory, "output.csv")
+            state_file = output_file + IncrementalState.SUFFIX
+            file_mappings = {'paypal': "./tests/resources/paypal-example.csv"}
+            processor = TransactionProcessor({'paypal': PaypalParser()})
+            
+            processor.process_files(file_mappings, output_file, incremental=True)
+            self.assertTrue(os.path.exists(state_file))
+            self.assertEqual(processor.process_files(file_mappings, output_file, incremental=True), 0)
+            
+            # A full run rewrites the output and drops the sidecar that described the old one
+            processor.process_files(file_mappings, output_file)
+            self.assertFalse(os.path.exists(state_file))
+            with self.assertRaises(ValueError):
+                processor.process_files(file_mappings, output_file, incremental=True)
+            
+            os.remove(output_file)
+            processor.process_files(file_mappings, output_file, incremental=True)
+            with open(output_file, 'a', encoding='utf-8') as file:
+                file.write("edited\n")
+            with self.assertRaises(ValueError):
+                processor.process_files(file_mappings, output_file, incremental=True)
+
+class TransactionBatchTest(unittest.TestCase):
+    def test_columnar_parse_matches_row_parse(self):
+        cases = [
+            (SplitwiseParser(), "./tests/resources/splitwise-example.csv"),
+            (PaypalParser(), "./tests/resources/paypal-example.csv"),
+            (SatispayParser(), "./tests/resources/satispay-example.xlsx")
+        ]
+        for parser, filepath in cases:
+            with self.subTest(parser=type(parser).__name__):
+                self.assertEqual(list(parser.parse_batch(filepath)), parser.parse_file(filepath))
+    
+    def test_numpy_and_fallback_parses_agree(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paypal_path = os.path.join(directory, "paypal.csv")
+            splitwise_path = os.path.join(directory, "splitwise.csv")
+            with open("./tests/resources/paypal-example.csv", 'r', encoding='utf-8') as file:
+                paypal = file.read()
+            with open(paypal_path, 'w', encoding='utf-8') as file:
+                file.write(paypal + '"4/2/2025","10:00:00","Europe/Rome","Pagamento","EUR","n/d","0,00","0,00","0,00",'
+                           '"X","","Nessuno","","","0,00","0,00","",""\n')
+            with open("./tests/resources/splitwise-example.csv", 'r', encoding='utf-8') as file:
+                splitwise = file.read()
+            with open(splitwise_path, 'w', encoding='utf-8') as file:
+                file.write(splitwise + "2025-04-05,Costo illeggibile,Altro,n/d,EUR,10.00,-10.00\n"
+                                       "2025-04-05,Quota illeggibile,Altro,20.00,EUR,n/d,-10.00\n")
+            
+            cases = [(PaypalParser(), paypal_path), (SplitwiseParser(), splitwise_path)]
+            for parser, filepath in cases:
+                with self.subTest(parser=type(parser).__name__):
+                    with unittest.mock.patch("transaction_batch.numpy_module", return_value=None), \
+                            unittest.mock.patch(f"{type(parser).__module__}.numpy_module", return_value=None):
+                        fallback = list(parser.parse_batch(filepath))
+                    self.assertEqual(list(parser.parse_batch(filepath)), fallback)
+                    self.assertEqual(fallback, parser.parse_file(filepath))
+    
+    def test_summary_from_batch(self):
+        processor = TransactionProcessor()
+        transactions = PaypalParser().parse_file("./tests/resources/paypal-example.csv")
+        summary = processor.get_transaction_summary(PaypalParser().parse_batch("./tests/resources/paypal-example.csv"))
+        
+        self.assertEqual(summary, processor.get_transaction_summary(transactions))
+        self.assertEqual(summary['total_transactions'], 6)
+        self.assertEqual(summary['by_source'], {'PAYPAL': 6})
+        self.assertEqual(summary['amount_by_month'], {'2025-02': 110.5, '2025-04': 148.1, '2025-05': 93.5})
+
+    def test_numpy_and_fallback_columns_agree(self):
+        transactions = list(synthetic_transactions(3000, seed=4))
+        
+        def run():
+            batch = TransactionBatch.from_transactions(transactions)
+            expensive = batch.filter([cents > 15000 for cents in batch.amount_cents]).sorted_by_date()
+            return list(expensive), batch.month_ordinals(), batch.summary()
+        
+        with unittest.mock.patch("transaction_batch.numpy_module", return_value=None):
+            fallback = run()
+        self.assertEqual(run(), fallback)
+        self.assertEqual(fallback[0], sorted((t for t in transactions if t.amount_cents > 15000), key=lambda t: t.date))
+        self.assertEqual(fallback[2], TransactionProcessor().get_transaction_summary(transactions))
+
+class InstrumentationTest(unittest.TestCase):
+    def test_profiler_counts_rows_per_stage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler = Profiler()
+            processor = TransactionProcessor({'paypal': PaypalParser()}, profiler=profiler)
+            processor.process_files({'paypal': "./tests/resources/paypal-example.csv"}, os.path.join(tmpdir, "output.csv"))
+        
+        report = profiler.report()
+        self.assertEqual(report['counters']['paypal.rows_in'], 12)
+        self.assertEqual(report['counters']['paypal.rows_filtered'], 6)
+        self.assertEqual(report['counters']['paypal.rows_out'], 6)
+        self.assertEqual(report['counters']['format.rows_out'], 9)
+        for stage in ("paypal.parse", "paypal.open", "paypal.decode", "format.render", "format.write", "merge"):
+            self.assertIn(stage, report['stages'])
+    
+    def test_profiled_rows_match_default_rows(self):
+        for parser, filepath in ((PaypalParser(), "./tests/resources/paypal-example.csv"),
+                                 (SplitwiseParser(), "./tests/resources/splitwise-example.csv"),
+                                 (SatispayParser(), "./tests/resources/satispay-example.xlsx")):
+            with self.subTest(parser=type(parser).__name__):
+                with unittest.mock.patch.object(type(parser.profiler), 'clock') as clock:
+                    transactions = parser.parse_file(filepath)
+                    since_transactions = parser.parse_file(filepath, transactions[-1].date)
+                clock.assert_not_called()
+                
+                parser.profiler = Profiler()
+                self.assertEqual(parser.parse_file(filepath), transactions)
+                self.assertEqual(parser.parse_file(filepath, transactions[-1].date), since_transactions)
+                self.assertIn(f"{parser.profile_name}.open", parser.profiler.report()['stages'])
+
+class TransactionStoreTest(unittest.TestCase):
+    def test_store_output_matches_direct_run_and_is_idempotent(self):
+        file_mappings = {
+            'splitwise': "./tests/resources/splitwise-example.csv",
+            'paypal': "./tests/resources/paypal-example.csv",
+            'satispay': "./tests/resources/satispay-example.xlsx"
+        }
+        parsers = lambda: {'splitwise': SplitwiseParser(), 'paypal': PaypalParser(), 'satispay': SatispayParser()}
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            direct_output = os.path.join(tmpdir, "direct.csv")
+            store_output = os.path.join(tmpdir, "store.csv")
+            TransactionProcessor(parsers()).process_files(file_mappings, direct_output)
+            
+            with TransactionStore(os.path.join(tmpdir, "transactions.db")) as store:
+                processor = TransactionProcessor(parsers(), store=store)
+                processor.process_files(file_mappings, store_output)
+                processor.process_files(file_mappings, store_output)
+                
+                self.assertEqual(len(store), 14)
+                self.assertEqual(store.add(PaypalParser().parse_file(file_mappings['paypal'])), 0)
+                transactions = [t for name, parser in parsers().items() for t in parser.parse_file(file_mappings[name])]
+                self.assertEqual(processor.get_transaction_summary(), processor.get_transaction_summary(transactions))
+            
+            with open(direct_output, 'r', encoding='utf-8') as file:
+                direct_content = file.read()
+            with open(store_output, 'r', encoding='utf-8') as file:
+                store_content = file.read()
+        
+        self.assertEqual(store_content, direct_content)
+
+class CategorizationTest(unittest.TestCase):
+    def test_rules_tag_transactions_and_add_month_subtotals(self):
+        categorizer = Categorizer([
+            CategoryRule("Travel", keywords=("viaggi", "Trenitalia")),
+            CategoryRule("Food", keywords=("cena", "spesa"), sources=("splitwise",)),
+            CategoryRule("Health", pattern=r"clinic\w*")
+        ], default="Other")
+        transactions = list(categorizer.tag([
+            Transaction("Viaggi Marco Polo SRL", 3550, datetime(2025, 2, 3), BackType.PAYPAL, "(Paypal)"),
+            Transaction("Clinica Salute Plus SRL", 7500, datetime(2025, 2, 8), BackType.PAYPAL, "(Paypal)"),
+            Transaction("Cena da mario", 2500, datetime(2025, 2, 4), BackType.SPLITWISE, "(Split)"),
+            Transaction("Cena da mario", 1000, datetime(2025, 2, 5), BackType.PAYPAL, "(Paypal)")
+        ]))
+        
+        self.assertEqual([t.category for t in transactions], ["Travel", "Health", "Food", "Other"])
+        
+        rows = TransactionFormatter(category_subtotals=True).format_transactions(transactions)
+        self.assertEqual(rows[1], ["(Paypal) Viaggi Marco Polo SRL", "Travel", "35,50€", "Feb"])
+        self.assertEqual(rows[-5:], [
+            [""],
+            ["Total", "Food", "25,00€", "Feb"],
+            ["Total", "Health", "75,00€", "Feb"],
+            ["Total", "Other", "10,00€", "Feb"],
+            ["Total", "Travel", "35,50€", "Feb"]
+        ])
+
+    def test_thousands_of_rules_match_like_one_regex_per_rule(self):
+        rules = category_rules(3000, seed=6)
+        transactions = list(categorized_transactions(200, 3000, seed=6))
+        categorizer = Categorizer(rules)
+        
+        def expression(rule):
+            alternatives = [rf"\b{re.escape(normalize_description(keyword))}\b" for keyword in rule.keywords]
+            if rule.pattern:
+                alternatives.append(f"(?:{rule.pattern})")
+            return re.compile("|".join(alternatives), re.IGNORECASE)
+        
+        expressions = [expression(rule) for rule in rules]
+        def expected(transaction):
+            source_names = (transaction.source_type.name.lower(), transaction.source_prefix.strip("()").lower())
+            description = normalize_description(transaction.description)
+            matches = [(match.start(), index) for index, (rule, expression) in enumerate(zip(rules, expressions))
+                       if rule.applies_to(source_names) and (match := expression.search(description))]
+            return rules[min(matches)[1]].category if matches else None
+        
+        categories = [categorizer.categorize(transaction) for transaction in transactions]
+        self.assertEqual(categories, [expected(transaction) for transaction in transactions])
+        self.assertGreater(sum(category is not None for category in categories), 20)
+
+class ChunkedParsingTest(unittest.TestCase):
+    def test_chunked_parse_matches_serial_parse(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            splitwise_path = os.path.join(tmpdir, "splitwise.csv")
+            with open(splitwise_path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(["Data", "Descrizione", "Categorie", "Costo", "Valuta"] + splitwise_members(3))
+                for i, row in enumerate(splitwise_rows(3000, seed=3)):
+                    if i % 7 == 0:
+                        row[1] = f'Cena "da mario"\nriga {i}'
+                    writer.writerow(row)
+            paypal_path = os.path.join(tmpdir, "paypal.csv")
+            generate_paypal(paypal_path, 3000, seed=3)
+            
+            for parser, path in [(SplitwiseParser(keep_raw=True), splitwise_path), (PaypalParser(), paypal_path)]:
+                with self.subTest(parser=type(parser).__name__):
+                    serial = parser.parse_file(path)
+                    self.assertEqual(list(parse_chunked(parser, path, workers=4, min_chunk_bytes=1024)), serial)
+                    self.assertGreater(len(serial), 1000)
+
+class SplitwiseMembersTest(unittest.TestCase):
+    def test_single_pass_matches_one_parse_per_member(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            splitwise_path = os.path.join(tmpdir, "splitwise.csv")
+            generate_splitwise(splitwise_path, 2000, members=4, seed=5)
+            
+            by_member = SplitwiseParser().parse_members(splitwise_path)
+            self.assertEqual(list(by_member), splitwise_members(4))
+            for member, transactions in by_member.items():
+                with self.subTest(member=member):
+                    self.assertEqual(transactions, SplitwiseParser(member).parse_file(splitwise_path))
+            
+            processor = TransactionProcessor({'splitwise': SplitwiseParser()})
+            file_mappings = {'splitwise': "./tests/resources/splitwise-example.csv"}
+            counts = processor.process_members(file_mappings, os.path.join(tmpdir, "output.csv"))
+            self.assertEqual(counts, {'christian rocchetti': 3, 'Giovanna': 4})
+            with open(os.path.join(tmpdir, "output-giovanna.csv"), encoding="utf-8") as file:
+                self.assertIn("(Split) Cena al mario 2;;0,00€;Apr", file.read())
+            
+            xlsx_path = os.path.join(tmpdir, "output.xlsx")
+            processor.process_members(file_mappings, xlsx_path, members=["Giovanna"])
+            self.assertEqual(openpyxl.load_workbook(xlsx_path).sheetnames, ["Giovanna"])
+
+class MonthlyAggregatesTest(unittest.TestCase):
+    def test_index_built_while_formatting_answers_range_queries(self):
+        transactions = [t for parser, path in [(SplitwiseParser(), "./tests/resources/splitwise-example.csv"),
+                                               (PaypalParser(), "./tests/resources/paypal-example.csv")]
+                        for t in parser.parse_file(path)]
+        formatter = TransactionFormatter(subtotals=True)
+        rows = formatter.format_transactions(transactions)
+        aggregates = formatter.aggregates
+        
+        self.assertEqual(aggregates.spend_by_source((2025, 4), (2025, 6)), {'SPLITWISE': 6750, 'PAYPAL': 24160})
+        self.assertEqual(aggregates.counts_by_source((2025, 1), (2025, 3)), {'PAYPAL': 2})
+        self.assertEqual(aggregates.summary(), TransactionProcessor().get_transaction_summary(transactions))
+        self.assertEqual(aggregates.rows(), MonthlyAggregates.from_transactions(transactions).rows())
+        self.assertEqual(rows[4:6], [["Total (Paypal)", "", "110,50€", "Feb"], ["Total", "", "110,50€", "Feb"]])
+
+class AsyncProcessingTest(unittest.TestCase):
+    def test_aprocess_uploads_matches_process_files(self):
+        file_mappings = {
+            'splitwise': "./tests/resources/splitwise-example.csv",
+            'paypal': "./tests/resources/paypal-example.csv",
+            'satispay': "./tests/resources/satispay-example.xlsx"
+        }
+        processor = TransactionProcessor({'splitwise': SplitwiseParser(), 'paypal': PaypalParser(), 'satispay': SatispayParser()},
+                                         max_workers=2)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_file = os.path.join(tmpdir, "output.csv")
+            processor.process_files(file_mappings, output_file)
+            with open(output_file, 'rb') as file:
+                expected = file.read()
+        
+        def uploads():
+            with open(file_mappings['splitwise'], 'rb') as file:
+                splitwise = file.read()
+            with open(file_mappings['paypal'], 'rb') as file:
+                paypal = io.BytesIO(file.read())
+            with open(file_mappings['satispay'], 'rb') as file:
+                satispay = file.read()
+            return {'splitwise': splitwise, 'paypal': paypal, 'satispay': satispay}
+        
+        async def run():
+            return await asyncio.gather(*(processor.aprocess(uploads()) for _ in range(4)))
+        
+        try:
+            results = asyncio.run(run())
+            second_loop_results = asyncio.run(run())
+        finally:
+            processor.shutdown()
+        
+        self.assertEqual(results, [expected] * 4)
+        self.assertEqual(second_loop_results, [expected] * 4)
+
+    def test_path_inputs_use_the_parse_cache(self):
+        file_mappings = {'paypal': "./tests/resources/paypal-example.csv"}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ParseCache(tmpdir)
+            processor = TransactionProcessor({'paypal': PaypalParser()}, cache=cache)
+            try:
+                first = asyncio.run(processor.aprocess(file_mappings))
+                processor.parsers['paypal'].parse_file = lambda *args: self.fail("parsed despite a cache entry")
+                second = asyncio.run(processor.aprocess(file_mappings))
+            finally:
+                processor.shutdown()
+        
+        self.assertEqual(second, first)
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+    
+    def test_concurrent_calls_keep_their_own_subtotals(self):
+        paypal = "./tests/resources/paypal-example.csv"
+        splitwise = "./tests/resources/splitwise-example.csv"
+        processor = TransactionProcessor({'splitwise': SplitwiseParser(), 'paypal': PaypalParser()},
+                                         formatter=TransactionFormatter(subtotals=True), max_workers=2)
+        expected = [TransactionFormatter(subtotals=True).format_transactions(PaypalParser().parse_file(paypal)),
+                    TransactionFormatter(subtotals=True).format_transactions(SplitwiseParser().parse_file(splitwise))]
+        
+        async def run():
+            return await asyncio.gather(*(processor.aprocess(mappings, 'rows')
+                                          for mappings in [{'paypal': paypal}, {'splitwise': splitwise}] * 4))
+        
+        try:
+            results = asyncio.run(run())
+        finally:
+            processor.shutdown()
+        
+        self.assertEqual(results, expected * 4)
+        self.assertEqual(processor.formatter.aggregates.months(), [])
+
+    def test_failed_upload_raises_its_own_errors(self):
+        with open("./tests/resources/paypal-example.csv", 'rb') as file:
+            paypal = file.read()
+        processor = TransactionProcessor({'paypal': PaypalParser()}, max_workers=2)
+        
+        async def run():
+            return await asyncio.gather(*(processor.aprocess({'paypal': upload}, output_format)
+                                          for upload in (b"garbage", paypal) for output_format in ('csv', 'rows')),
+                                        return_exceptions=True)
+        
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = asyncio.run(run())
+        finally:
+            processor.shutdown()
+        
+        for failed in results[:2]:
+            self.assertIsInstance(failed, ParseError)
+            self.assertEqual(len(failed.errors), 1)
+        self.assertTrue(results[2])
+        self.assertTrue(results[3])
+        self.assertFalse(hasattr(processor.parsers['paypal'], 'errors'))
+    
+    def test_pool_parse_errors_reach_the_caller(self):
+        processor = TransactionProcessor({'paypal': PaypalParser(), 'splitwise': SplitwiseParser()},
+                                         executor='thread', max_workers=2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            garbage = os.path.join(tmpdir, "garbage.csv")
+            with open(garbage, 'w', encoding='utf-8') as file:
+                file.write("not,an,export\n")
+            
+            with collect_errors() as errors, contextlib.redirect_stdout(io.StringIO()):
+                transactions = list(processor.iter_transactions({'paypal': garbage,
+                                                                 'splitwise': "./tests/resources/splitwise-example.csv"}))
+        
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(transactions)
+
+class BenchmarkGeneratorTest(unittest.TestCase):
+    def test_generated_exports_are_deterministic_and_parse(self):
+        registry = ParserRegistry()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for source, (generate, filename) in GENERATORS.items():
+                with self.subTest(source=source):
+                    first, second = os.path.join(tmpdir, "a-" + filename), os.path.join(tmpdir, "b-" + filename)
+                    generate(first, 200, seed=7)
+                    generate(second, 200, seed=7)
+                    
+                    transactions = registry.create(source).parse_file(first)
+                    self.assertEqual(transactions, registry.create(source).parse_file(second))
+                    self.assertTrue(0 < len(transactions) < 200)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
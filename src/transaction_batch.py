@@ -0,0 +1,247 @@
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Optional
+from models import Transaction, BackType
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+MICROSECONDS_PER_DAY = 86400 * 1000000
+
+@lru_cache(maxsize=None)
+def numpy_module():
+    """NumPy when it is installed, else ``None``; imported on first use so startup never pays for it."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def cents_column(cents: List[Optional[int]]) -> tuple:
+    """``cents`` as an int64 NumPy array, unparsed ``None`` values as 0, and the mask of the parsed ones."""
+    numpy = numpy_module()
+    parsed = numpy.fromiter((value is not None for value in cents), dtype=bool, count=len(cents))
+    values = numpy.fromiter((value or 0 for value in cents), dtype=numpy.int64, count=len(cents))
+    return values, parsed
+
+class TransactionBatch:
+    """Column-oriented collection of transactions.
+
+    Amounts, dates and sources live in typed ``array`` columns and descriptions
+    are interned in a table. With NumPy installed, filters, sorts and summaries
+    run on zero-copy NumPy views of the columns (boolean masks, ``argsort``,
+    ``bincount``); without it they fall back to plain column-wise loops.
+    """
+    
+    COLUMNS = {
+        'amount_cents': 'q',
+        'date_ordinals': 'q',
+        'day_microseconds': 'q',
+        'source_codes': 'b',
+        'description_ids': 'q'
+    }
+    
+    def __init__(self):
+        for name, typecode in self.COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.descriptions: List[str] = []
+        self.prefixes: Dict[int, str] = {}
+        self._description_index: Dict[str, int] = {}
+    
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Transaction]) -> "TransactionBatch":
+        batch = cls()
+        for transaction in transactions:
+            batch.append(transaction)
+        return batch
+    
+    @classmethod
+    def from_columns(cls, source_type: BackType, source_prefix: str, descriptions: Iterable[str],
+                     amount_cents: Iterable[int], dates: Iterable[datetime]) -> "TransactionBatch":
+        batch = cls()
+        batch.prefixes[source_type.value] = source_prefix
+        numpy = numpy_module()
+        if numpy is not None and isinstance(amount_cents, numpy.ndarray):
+            batch.amount_cents.frombytes(amount_cents.astype(batch.amount_cents.typecode).tobytes())
+        else:
+            batch.amount_cents.extend(amount_cents)
+        dates = list(dates)
+        moments = {value: (value.toordinal(), cls._microseconds_of_day(value)) for value in set(dates)}
+        for column, values in zip((batch.date_ordinals, batch.day_microseconds), zip(*map(moments.__getitem__, dates))):
+            column.extend(values)
+        batch.description_ids.extend(map(batch._intern, descriptions))
+        batch.source_codes.extend([source_type.value] * len(batch.amount_cents))
+        return batch
+    
+    def append(self, transaction: Transaction):
+        self.prefixes.setdefault(transaction.source_type.value, transaction.source_prefix)
+        self.amount_cents.append(transaction.amount_cents)
+        self.date_ordinals.append(transaction.date.toordinal())
+        self.day_microseconds.append(self._microseconds_of_day(transaction.date))
+        self.source_codes.append(transaction.source_type.value)
+        self.description_ids.append(self._intern(transaction.description))
+    
+    def __len__(self) -> int:
+        return len(self.amount_cents)
+    
+    def __iter__(self) -> Iterator[Transaction]:
+        for i in range(len(self)):
+            yield self.transaction_at(i)
+    
+    def transaction_at(self, i: int) -> Transaction:
+        source_code = self.source_codes[i]
+        return Transaction(
+            description=self.descriptions[self.description_ids[i]],
+            amount_cents=self.amount_cents[i],
+            date=datetime.fromordinal(self.date_ordinals[i]) + timedelta(microseconds=self.day_microseconds[i]),
+            source_type=BackType(source_code),
+            source_prefix=self.prefixes[source_code]
+        )
+    
+    def column(self, name: str):
+        """The ``name`` column as a NumPy view, or as the ``array`` itself without NumPy.
+
+        Comparisons on the view give masks for ``filter``, e.g. ``batch.column('amount_cents') > 1000``.
+        """
+        numpy = numpy_module()
+        column = getattr(self, name)
+        if numpy is None:
+            return column
+        return numpy.frombuffer(column, dtype=column.typecode) if len(column) else numpy.zeros(0, dtype=column.typecode)
+    
+    def filter(self, mask: Iterable[bool]) -> "TransactionBatch":
+        numpy = numpy_module()
+        if numpy is None:
+            mask = list(mask)
+            return self._select(lambda column: compress(column, mask))
+        
+        mask = numpy.asarray(mask if isinstance(mask, (list, numpy.ndarray)) else list(mask), dtype=bool)
+        return self._select_numpy(mask)
+    
+    def take(self, indexes: Iterable[int]) -> "TransactionBatch":
+        numpy = numpy_module()
+        if numpy is None:
+            indexes = list(indexes)
+            return self._select(lambda column: (column[i] for i in indexes))
+        
+        return self._select_numpy(numpy.asarray(indexes, dtype=numpy.intp))
+    
+    def sorted_by_date(self) -> "TransactionBatch":
+        """Stable sort on date and time, like ``sorted(transactions, key=date)``."""
+        numpy = numpy_module()
+        if numpy is None:
+            return self.take(sorted(range(len(self)), key=lambda i: (self.date_ordinals[i], self.day_microseconds[i])))
+        
+        moments = self.column('date_ordinals') * MICROSECONDS_PER_DAY + self.column('day_microseconds')
+        return self.take(numpy.argsort(moments, kind='stable'))
+    
+    def month_ordinals(self) -> List[int]:
+        numpy = numpy_module()
+        if numpy is not None:
+            return self._month_array().tolist()
+        
+        months = {}
+        result = []
+        for ordinal in self.date_ordinals:
+            month = months.get(ordinal)
+            if month is None:
+                day = date.fromordinal(ordinal)
+                month = months[ordinal] = day.year * 12 + day.month - 1
+            result.append(month)
+        return result
+    
+    def summary(self) -> dict:
+        if numpy_module() is None:
+            count_by_source, cents_by_source, cents_by_month, cents_by_year = self._totals()
+        else:
+            count_by_source, cents_by_source, cents_by_month, cents_by_year = self._totals_numpy()
+        
+        return {
+            'total_transactions': len(self),
+            'total_amount': sum(cents_by_source.values()) / 100,
+            'by_source': {BackType(code).name: count for code, count in sorted(count_by_source.items())},
+            'amount_by_source': {BackType(code).name: cents / 100 for code, cents in sorted(cents_by_source.items())},
+            'amount_by_month': {f"{month // 12}-{month % 12 + 1:02d}": cents / 100
+                                for month, cents in sorted(cents_by_month.items())},
+            'amount_by_year': {year: cents / 100 for year, cents in sorted(cents_by_year.items())}
+        }
+    
+    def _totals(self) -> tuple:
+        """Per source, month and year totals, reduced from one pass keyed by (source, day)."""
+        days = list(zip(self.source_codes, self.date_ordinals))
+        count_by_day = Counter(days)
+        cents_by_day = Counter()
+        for day, cents in zip(days, self.amount_cents):
+            cents_by_day[day] += cents
+        
+        count_by_source, cents_by_source, cents_by_month, cents_by_year = Counter(), Counter(), Counter(), Counter()
+        for (source_code, ordinal), cents in cents_by_day.items():
+            day = date.fromordinal(ordinal)
+            month = day.year * 12 + day.month - 1
+            count_by_source[source_code] += count_by_day[source_code, ordinal]
+            cents_by_source[source_code] += cents
+            cents_by_month[month] += cents
+            cents_by_year[day.year] += cents
+        return count_by_source, cents_by_source, cents_by_month, cents_by_year
+    
+    def _totals_numpy(self) -> tuple:
+        numpy = numpy_module()
+        if not len(self):
+            return {}, {}, {}, {}
+        
+        amounts = self.column('amount_cents')
+        codes = self.column('source_codes').astype(numpy.intp)
+        months = self._month_array()
+        
+        def reduce(keys) -> tuple:
+            first = int(keys.min())
+            keys = keys - first
+            counts = numpy.bincount(keys)
+            cents = numpy.bincount(keys, weights=amounts)
+            present = numpy.flatnonzero(counts)
+            return ({int(key) + first: int(counts[key]) for key in present},
+                    {int(key) + first: int(round(cents[key])) for key in present})
+        
+        count_by_source, cents_by_source = reduce(codes)
+        _, cents_by_month = reduce(months)
+        _, cents_by_year = reduce(months // 12)
+        return count_by_source, cents_by_source, cents_by_month, cents_by_year
+    
+    def _month_array(self):
+        """``year * 12 + month - 1`` of every row, through ``datetime64`` month truncation."""
+        numpy = numpy_module()
+        days = (self.column('date_ordinals') - EPOCH_ORDINAL).astype('datetime64[D]')
+        return days.astype('datetime64[M]').astype(numpy.int64) + 1970 * 12
+    
+    def _select(self, pick) -> "TransactionBatch":
+        batch = self._empty_like()
+        for name in self.COLUMNS:
+            getattr(batch, name).extend(pick(getattr(self, name)))
+        return batch
+    
+    def _select_numpy(self, selector) -> "TransactionBatch":
+        batch = self._empty_like()
+        for name in self.COLUMNS:
+            getattr(batch, name).frombytes(self.column(name)[selector].tobytes())
+        return batch
+    
+    def _empty_like(self) -> "TransactionBatch":
+        batch = TransactionBatch()
+        batch.prefixes = dict(self.prefixes)
+        batch.descriptions = self.descriptions
+        batch._description_index = self._description_index
+        return batch
+    
+    def _intern(self, description: str) -> int:
+        index = self._description_index.get(description)
+        if index is None:
+            index = self._description_index[description] = len(self.descriptions)
+            self.descriptions.append(description)
+        return index
+    
+    @staticmethod
+    def _microseconds_of_day(value: datetime) -> int:
+        if not isinstance(value, datetime):
+            return 0
+        return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
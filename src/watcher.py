@@ -0,0 +1,160 @@
+import heapq
+import os
+import time
+from collections import defaultdict
+from itertools import chain, repeat
+from operator import itemgetter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from models import Transaction
+from incremental import IncrementalState
+from processor import TransactionProcessor
+from parser.parser import TransactionParser
+
+FileMappings = Dict[str, List[str]]
+
+class PollingWatcher:
+    """Reports files whose size or modification time changed since the last poll.
+
+    The standard library has no inotify binding, so changes are found by
+    polling ``os.stat``; a missing file is reported once when it disappears.
+    """
+    
+    def __init__(self):
+        self.snapshot: Dict[str, Tuple[int, int]] = {}
+    
+    def changed(self, paths: List[str]) -> List[str]:
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        
+        changed = [path for path in paths if snapshot.get(path) != self.snapshot.get(path)]
+        changed.extend(path for path in self.snapshot if path not in snapshot and path not in changed)
+        self.snapshot = snapshot
+        return changed
+
+class WatchSession:
+    """Keeps parsed transactions and rendered month blocks in memory between changes.
+
+    When a file changes only that file is parsed again and only the months it
+    had or now has are formatted again; the other month blocks are reused when
+    the output is rewritten. With a deduplicator the cross-file dedup runs again
+    over the resident transactions, and the months it changes are formatted too.
+    """
+    
+    def __init__(self, processor: TransactionProcessor, mappings_provider: Callable[[], FileMappings],
+                 output_file: str, interval: float = 2.0,
+                 parser_factory: Optional[Callable[[str], TransactionParser]] = None):
+        if processor.store is not None:
+            raise ValueError("Watch mode cannot be combined with a transaction store")
+        self.processor = processor
+        self.mappings_provider = mappings_provider
+        self.output_file = output_file
+        self.interval = interval
+        self.parser_factory = parser_factory
+        self.watcher = PollingWatcher()
+        self.files: List[Tuple[str, str]] = []
+        self.by_file: Dict[str, Dict[int, List[Transaction]]] = {}
+        self.month_rows: Dict[int, List[List[str]]] = {}
+        self.deduplicated: Dict[int, List[Transaction]] = {}
+    
+    def run(self, max_polls: Optional[int] = None):
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            self.poll()
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                time.sleep(self.interval)
+    
+    def poll(self) -> bool:
+        """Apply the changes found since the last poll; return whether the output was rewritten."""
+        mappings = self.mappings_provider()
+        files = [(parser_name, path) for parser_name, paths in mappings.items() for path in paths]
+        
+        changed = set(self.watcher.changed([path for _, path in files]))
+        changed.update(path for _, path in self.files if path not in {p for _, p in files})
+        reordered = files != self.files
+        self.files = files
+        if not changed and not reordered:
+            return False
+        
+        started = time.perf_counter()
+        affected = set()
+        for parser_name, path in files:
+            if path in changed:
+                affected.update(self.by_file.get(path, {}))
+                self.by_file[path] = self._parse(parser_name, path)
+                affected.update(self.by_file[path])
+        for path in changed - {path for _, path in files}:
+            affected.update(self.by_file.pop(path, {}))
+        
+        if reordered:
+            affected.update(month for months in self.by_file.values() for month in months)
+        if self.processor.deduplicator is not None:
+            affected.update(self._deduplicate())
+        
+        for month in affected:
+            self._render_month(month)
+        
+        self._write()
+        print(f"Updated {len(affected)} month(s) from {len(changed)} changed file(s) "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return True
+    
+    def _parse(self, parser_name: str, path: str) -> Dict[int, List[Transaction]]:
+        if parser_name not in self.processor.parsers and self.parser_factory is not None:
+            self.processor.add_parser(parser_name, self.parser_factory(parser_name))
+        
+        months = defaultdict(list)
+        if os.path.exists(path):
+            for transaction in self.processor.iter_transactions({parser_name: path}):
+                months[transaction.month_ordinal].append(transaction)
+        return dict(months)
+    
+    def _deduplicate(self) -> set:
+        """Drop the cross-file duplicates of every resident month; return the months whose transactions changed."""
+        deduplicator = self.processor.deduplicator
+        deduplicator.dropped.clear()
+        streams = [self._file_stream(path, file_index) for file_index, (_, path) in enumerate(self.files)]
+        ranks = self.processor.source_ranks(parser_name for parser_name, _ in self.files)
+        
+        months = defaultdict(list)
+        for transaction in deduplicator.filter(heapq.merge(*streams, key=lambda x: (x[0].month_ordinal, ranks[x[1]], x[0].date))):
+            months[transaction.month_ordinal].append(transaction)
+        
+        changed = {month for month in set(months) | set(self.deduplicated) if months.get(month) != self.deduplicated.get(month)}
+        self.deduplicated = dict(months)
+        return changed
+    
+    def _file_stream(self, path: str, file_index: int) -> Iterator[Tuple[Transaction, int]]:
+        months = self.by_file.get(path, {})
+        for month in sorted(months):
+            for transaction in months[month]:
+                yield transaction, file_index
+    
+    def _month_transactions(self, month: int) -> Iterator[Transaction]:
+        if self.processor.deduplicator is not None:
+            return iter(self.deduplicated.get(month, ()))
+        ranks = self.processor.source_ranks(parser_name for parser_name, _ in self.files)
+        streams = [zip(self.by_file.get(path, {}).get(month, ()), repeat(rank)) for (_, path), rank in zip(self.files, ranks)]
+        return map(itemgetter(0), heapq.merge(*streams, key=lambda x: (x[1], x[0].date)))
+    
+    def _render_month(self, month: int):
+        rows = list(self.processor.formatter.iter_formatted_rows(self._month_transactions(month), presorted=True))
+        if rows:
+            self.month_rows[month] = rows
+        else:
+            self.month_rows.pop(month, None)
+    
+    def _write(self):
+        formatter = self.processor.formatter
+        if formatter.is_xlsx(self.output_file):
+            transactions = chain.from_iterable(self._month_transactions(month) for month in sorted(self.month_rows))
+            formatter.write_to_xlsx(transactions, self.output_file, presorted=True)
+        else:
+            formatter.write_to_csv(chain.from_iterable(self.month_rows[month] for month in sorted(self.month_rows)),
+                                   self.output_file)
+        IncrementalState.discard(self.output_file)